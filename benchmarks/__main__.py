@@ -0,0 +1,96 @@
+import argparse
+import io
+import json
+import os
+import sys
+from typing import Dict, Tuple
+
+from . import suite
+
+# The results of the benchmarks which the next runs are compared with.
+DEFAULT_BASELINE_PATH: str = os.path.join(os.path.dirname(__file__), "baseline.json")
+# The run fails if any benchmark is slower than its baseline by more than this share.
+DEFAULT_THRESHOLD: float = 0.25
+DEFAULT_SCALES: str = "10000,100000"
+DEFAULT_DISK_ROOT: str = os.path.join(os.path.expanduser("~"), ".cache", "myrm", "benchmarks")
+DEFAULT_TMPFS_ROOT: str = "/dev/shm"
+
+
+def root(value: str) -> Tuple[str, str]:
+    """The function splits the user-entered root into its label and its path."""
+    label, separator, path = value.partition("=")
+    if not separator or not label or not path:
+        raise argparse.ArgumentTypeError(f"invalid root value: '{value}' (LABEL=PATH)")
+    return label, os.path.abspath(os.path.expanduser(path))
+
+
+def get_default_roots() -> Dict[str, str]:
+    roots = {"disk": DEFAULT_DISK_ROOT}
+    # The memory filesystem is not available on every platform.
+    if os.path.isdir(DEFAULT_TMPFS_ROOT):
+        roots["tmpfs"] = DEFAULT_TMPFS_ROOT
+    return roots
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Measure the performance of the myrm package."
+    )
+    parser.add_argument(
+        "--root",
+        action="append",
+        type=root,
+        help="the LABEL=PATH of the filesystem where the benchmarks are run (repeatable)",
+    )
+    parser.add_argument(
+        "--scales",
+        default=DEFAULT_SCALES,
+        help="the comma-separated numbers of the entries and files, e.g. 10000,100000,1000000",
+    )
+    parser.add_argument("--repeat", default=3, type=int, help="the number of the runs")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="the baseline path")
+    parser.add_argument(
+        "--threshold",
+        default=DEFAULT_THRESHOLD,
+        type=float,
+        help="the allowed slowdown against the baseline, e.g. 0.25 for 25 percent",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        default=False,
+        help="save the results as the new baseline instead of comparing them",
+    )
+    arguments = parser.parse_args()
+
+    roots = dict(arguments.root) if arguments.root else get_default_roots()
+    scales = [int(scale) for scale in arguments.scales.split(",")]
+
+    results = suite.run(roots, scales, arguments.repeat)
+
+    baseline: Dict[str, float] = {}
+    if os.path.isfile(arguments.baseline):
+        with io.open(arguments.baseline, mode="rt", encoding="utf-8") as stream_in:
+            baseline = json.load(stream_in)
+
+    for name, seconds in sorted(results.items()):
+        previous = baseline.get(name)
+        change = f"{(seconds / previous - 1) * 100:+.1f}%" if previous else "new"
+        print(f"{name:<32} {seconds * 1000:>12.3f} ms {change:>10}")
+
+    if arguments.update_baseline:
+        baseline.update(results)
+        with io.open(arguments.baseline, mode="wt", encoding="utf-8") as stream_out:
+            json.dump(baseline, stream_out, indent=2, sort_keys=True)
+            stream_out.write("\n")
+        return
+
+    regressions = suite.compare(results, baseline, arguments.threshold)
+    for name, previous, seconds in regressions:
+        print(f"Regression: {name} took {seconds:.6f}s against {previous:.6f}s in the baseline.")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from myrm import bucket, entries, rmlib
+
+# The number of the items which are trashed and restored in every run of the benchmarks.
+OPERATIONS: int = 100
+# The number of the files in every directory of the synthetic trees.
+FANOUT: int = 1000
+# The number of the entries shown on the page of the history.
+PAGE_SIZE: int = 20
+
+
+def make_tree(path: str, count: int) -> None:
+    """Create the directory tree with the determined number of the small files."""
+    for start in range(0, count, FANOUT):
+        top = os.path.join(path, f"dir_{start // FANOUT}")
+        os.makedirs(top)
+        for index in range(start, min(start + FANOUT, count)):
+            with open(os.path.join(top, f"file_{index}.txt"), mode="wb") as stream_out:
+                stream_out.write(b"test")
+
+
+def make_bucket(path: str, count: int) -> bucket.Bucket:
+    """Create the bucket which keeps the determined number of the trashed files."""
+    trash_bin = bucket.Bucket(
+        path=os.path.join(path, "trash"),
+        history_path=os.path.join(path, "history.pkl"),
+        per_device=False,
+    )
+    trash_bin.create()
+
+    trashed_at = time.time()
+    with trash_bin.history.batch():
+        for index in range(1, count + 1):
+            name = str(uuid.uuid4())
+            with open(os.path.join(trash_bin.path, name), mode="wb") as stream_out:
+                stream_out.write(b"test")
+
+            origin = os.path.join(path, "origin", f"file_{index}.txt")
+            trash_bin.history[name] = entries.Entry(
+                status=entries.Status.CORRECT.value,
+                index=index,
+                name=os.path.basename(origin),
+                path=entries._get_short_path(origin),  # pylint: disable=protected-access
+                trashed_at=trashed_at,
+                origin=origin,
+                size=4,
+                bucket=None,
+            )
+
+    # The snapshot of the bucket is saved, so the next startups are not reconciling it.
+    trash_bin.startup()
+    return trash_bin
+
+
+def measure(function: Callable[..., Any], *args: Any) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def restore_many(trash_bin: bucket.Bucket, indices: range) -> None:
+    for index in indices:
+        trash_bin.restore(index)
+
+
+def bench_bucket(path: str, count: int, repeat: int) -> Dict[str, float]:
+    """Time the startup, the history page, the trashing and the restoring in the bucket.
+
+    The startup is timed both when the bucket is reconciled and when it was not changed
+    since the previous startup. The startups and the page are the best of the runs; the
+    trashing and the restoring are the best mean time of one item, and every run restores
+    the items it has trashed.
+    """
+    trash_bin = make_bucket(path, count)
+    origin = os.path.join(path, "origin")
+    os.makedirs(origin, exist_ok=True)
+
+    def startup() -> None:
+        bucket.Bucket(
+            path=trash_bin.path, history_path=trash_bin.history.path, per_device=False
+        ).startup()
+
+    def show() -> None:
+        trash_bin.history.get_table(page=max(count // PAGE_SIZE // 2, 1), count=PAGE_SIZE)
+
+    # The modules which are imported by the first call are not measured.
+    show()
+
+    results: Dict[str, List[float]] = {
+        "reconcile": [],
+        "startup": [],
+        "show": [],
+        "rm": [],
+        "restore": [],
+    }
+    for _ in range(repeat):
+        # The snapshot of the bucket is dropped, so the whole bucket is reconciled.
+        os.remove(trash_bin.state_path)
+        results["reconcile"].append(measure(startup))
+        # The snapshot was saved by the previous startup, so nothing is reconciled.
+        results["startup"].append(measure(startup))
+        results["show"].append(measure(show))
+
+        paths = [os.path.join(origin, f"trashed_{index}.txt") for index in range(OPERATIONS)]
+        for item in paths:
+            with open(item, mode="wb") as stream_out:
+                stream_out.write(b"test")
+        first = trash_bin.history.get_next_index()
+
+        results["rm"].append(measure(trash_bin.rm_many, paths) / OPERATIONS)
+        indices = range(first, first + OPERATIONS)
+        results["restore"].append(measure(restore_many, trash_bin, indices) / OPERATIONS)
+
+    return {name: min(values) for name, values in results.items()}
+
+
+def bench_rmlib(path: str, count: int, repeat: int) -> Dict[str, float]:
+    """Time the removal and the item by item move of the tree with the determined size."""
+    results: Dict[str, List[float]] = {"rmdir": [], "mvdir": []}
+    for _ in range(repeat):
+        src, dst = os.path.join(path, "src"), os.path.join(path, "dst")
+        make_tree(src, count)
+        # The destination is not empty, so the tree is moved item by item instead of renamed.
+        make_tree(dst, 1)
+        results["mvdir"].append(measure(rmlib.mvdir, src, dst))
+        results["rmdir"].append(measure(rmlib.rmdir, dst))
+
+    return {name: min(values) for name, values in results.items()}
+
+
+@contextlib.contextmanager
+def workdir(root: str) -> Iterator[str]:
+    os.makedirs(root, exist_ok=True)
+    path = tempfile.mkdtemp(prefix="myrm-benchmarks-", dir=root)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def run(roots: Dict[str, str], scales: List[int], repeat: int = 3) -> Dict[str, float]:
+    """Run all the benchmarks on every root and scale; the results are in seconds."""
+    results: Dict[str, float] = {}
+    for label, root in roots.items():
+        for scale in scales:
+            for suite in (bench_bucket, bench_rmlib):
+                with workdir(root) as path:
+                    for name, seconds in suite(path, scale, repeat).items():
+                        results[f"{name}/{scale}/{label}"] = seconds
+
+    return results
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], threshold: float
+) -> List[Tuple[str, float, float]]:
+    """Get the results which are slower than the baseline by more than the threshold."""
+    return [
+        (name, baseline[name], seconds)
+        for name, seconds in sorted(results.items())
+        if name in baseline and seconds > baseline[name] * (1 + threshold)
+    ]
@@ -1,16 +1,41 @@
 import argparse
 import errno
-import glob
+import fnmatch
+import itertools
 import logging
 import os
+import re
 import sys
-from typing import Any
-
-from . import __version__, bucket, settings
+import time
+from typing import Any, Dict, Iterable, Pattern, Tuple
+
+from . import (
+    __version__,
+    bucket,
+    entries,
+    history,
+    metrics,
+    profiler,
+    settings,
+    walklib,
+)
+from .logger import setup_queue
 
 # Create a new instance of the preferred reporting system for this program.
 logger = logging.getLogger("myrm")
 
+# The user-entered time is either the time ago with one of these units or the date.
+TIME_UNITS: Dict[str, int] = {"s": 1, "m": 60, "h": 60 * 60, "d": settings.SECONDS_TO_DAYS}
+TIME_FORMATS: Tuple[str, ...] = (
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    entries.DATE_FORMAT,
+)
+
+# The number of the matched items which are trashed at once while the rest are searched.
+MATCH_BATCH_SIZE: int = 1000
+
 
 class SettingsArgumentsWrapper:
     app_settings: settings.AppSettings = settings.AppSettings()
@@ -23,8 +48,12 @@ class SettingsArgumentsWrapper:
         for name, value in (
             ("bucket_path", settings.DEFAULT_BUCKET_PATH),
             ("bucket_history_path", settings.DEFAULT_BUCKET_HISTORY_PATH),
+            ("bucket_history_engine", settings.DEFAULT_HISTORY_ENGINE),
             ("bucket_size", settings.DEFAULT_BUCKET_SIZE),
             ("bucket_storetime", settings.DEFAULT_CLEANUP_TIME),
+            ("bucket_eviction", settings.DEFAULT_EVICTION_POLICY),
+            ("metrics_format", settings.DEFAULT_METRICS_FORMAT),
+            ("metrics_path", settings.DEFAULT_METRICS_PATH),
         ):
             if getattr(arguments, name) == value:
                 continue
@@ -43,8 +72,52 @@ def abspath(path: str) -> str:
     return os.path.normpath(os.path.join(os.getcwd(), normpath))
 
 
+def timestamp(value: str) -> float:
+    """The function converts the user-entered time to the number of seconds since the epoch."""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", value.strip())
+    if match is not None:
+        return time.time() - float(match.group(1)) * TIME_UNITS[match.group(2)]
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    for date_format in TIME_FORMATS:
+        try:
+            return time.mktime(time.strptime(value.strip(), date_format))
+        except ValueError:
+            continue
+
+    raise argparse.ArgumentTypeError(f"invalid time value: '{value}'")
+
+
+def regex(value: str) -> Pattern[str]:
+    """The function compiles the user-entered regular expression."""
+    try:
+        return re.compile(value)
+    except re.error as err:
+        raise argparse.ArgumentTypeError(f"invalid regular expression: '{value}' ({err})")
+
+
+def pattern(value: str) -> Pattern[str]:
+    """The function converts the user-entered shell pattern to the regular expression."""
+    return re.compile(fnmatch.translate(value))
+
+
 def show(arguments: argparse.Namespace, trash_bin: bucket.Bucket) -> None:
-    print(trash_bin.history.get_table(page=arguments.page, count=arguments.limit))
+    trash_bin.history.dump(
+        sys.stdout,
+        arguments.format,
+        page=arguments.page,
+        count=arguments.limit,
+        sort=arguments.sort,
+        reverse=arguments.reverse,
+        since=arguments.since,
+        until=arguments.until,
+        origin_prefix=arguments.origin_prefix,
+        name_glob=arguments.name_glob,
+    )
 
 
 def restore(arguments: argparse.Namespace, trash_bin: bucket.Bucket) -> None:
@@ -59,12 +132,19 @@ def remove(arguments: argparse.Namespace, trash_bin: bucket.Bucket) -> None:
     if arguments.confirm and not confirmation("delete it"):
         return None
 
-    for file in arguments.FILES:
-        if arguments.regex:
-            for reg_file in sorted(glob.glob(os.path.join(abspath(file), arguments.regex))):
-                trash_bin.rm(abspath(reg_file), force=arguments.force, dry_run=arguments.dry_run)
-        else:
-            trash_bin.rm(abspath(file), force=arguments.force, dry_run=arguments.dry_run)
+    paths: Iterable[str] = arguments.FILES
+    matcher = arguments.regex or arguments.glob
+    if matcher is not None:
+        # The matched items are trashed while the rest of the directories are read, and
+        # the buckets created on the other devices meanwhile are added to the exclusions.
+        exclude = trash_bin.get_reserved_paths()
+        paths = itertools.chain.from_iterable(
+            walklib.match(path, matcher, arguments.max_depth, exclude) for path in paths
+        )
+
+    items = iter(paths)
+    for batch in iter(lambda: list(itertools.islice(items, MATCH_BATCH_SIZE)), []):
+        trash_bin.rm_many(batch, force=arguments.force, dry_run=arguments.dry_run)
 
     return None
 
@@ -79,6 +159,9 @@ def maintain_bucket(arguments: argparse.Namespace, trash_bin: bucket.Bucket) ->
 
         trash_bin.cleanup()
 
+    if arguments.recount:
+        trash_bin.recount(dry_run=arguments.dry_run)
+
     return None
 
 
@@ -112,6 +195,12 @@ def main() -> None:  # pylint: disable=too-many-statements
         default=settings.DEFAULT_BUCKET_HISTORY_PATH,
         help="the absolutly path where bucket history will be store on the curent machine",
     )
+    settings_parser.add_argument(
+        "--bucket-history-engine",
+        choices=settings.HISTORY_ENGINES,
+        default=settings.DEFAULT_HISTORY_ENGINE,
+        help="the storage which keeps the bucket history on the curent machine",
+    )
     settings_parser.add_argument(
         "--bucket-size",
         type=lambda size: int(size) * settings.BYTES_TO_MBYTES,
@@ -124,6 +213,24 @@ def main() -> None:  # pylint: disable=too-many-statements
         default=settings.DEFAULT_CLEANUP_TIME,
         help="bucket's storetime time in days",
     )
+    settings_parser.add_argument(
+        "--bucket-eviction",
+        choices=settings.EVICTION_POLICIES,
+        default=settings.DEFAULT_EVICTION_POLICY,
+        help="the order the items are permanently deleted in when the bucket is full",
+    )
+    settings_parser.add_argument(
+        "--metrics-format",
+        choices=settings.METRICS_FORMATS,
+        default=settings.DEFAULT_METRICS_FORMAT,
+        help="the format of the file where the operational metrics are collected",
+    )
+    settings_parser.add_argument(
+        "--metrics-path",
+        type=abspath,
+        default=settings.DEFAULT_METRICS_PATH,
+        help="the absolutly path of the file where the operational metrics are collected",
+    )
     settings_parser.set_defaults(get_settings=SettingsArgumentsWrapper())
 
     # Step -- 2.
@@ -169,6 +276,32 @@ def main() -> None:  # pylint: disable=too-many-statements
         dest="logging_level",
         help="print verbosely what happens while executing user's commands",
     )
+    logger_parser.add_argument(
+        "--aggregate-every",
+        type=int,
+        default=0,
+        metavar="N",
+        help="print the totals of every operation each N items instead of every item",
+    )
+    logger_parser.add_argument(
+        "--aggregate-interval",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help="print the totals of every operation each SECONDS instead of every item",
+    )
+    logger_parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=False,
+        help="print the time of every phase and the number of system calls to the stderr",
+    )
+    logger_parser.add_argument(
+        "--profile-output",
+        metavar="PATH",
+        type=abspath,
+        help="save the cProfile statistics in the pstats format to the path (implies --profile)",
+    )
 
     # Step -- 4.
     parser = argparse.ArgumentParser(
@@ -187,7 +320,35 @@ def main() -> None:  # pylint: disable=too-many-statements
     # Step -- 5.
     rm_parser = group.add_parser("rm", parents=[settings_parser, logger_parser, option_parser])
     rm_parser.add_argument("FILES", nargs="+", type=abspath)
-    rm_parser.add_argument("-r", "--regex", type=str, help="regular expression arrangements")
+    rm_group = rm_parser.add_mutually_exclusive_group()
+    rm_group.add_argument(
+        "-r",
+        "--regex",
+        type=regex,
+        help="trash the items inside FILES which names fully match the regular expression",
+    )
+    rm_group.add_argument(
+        "-g",
+        "--glob",
+        type=pattern,
+        help="trash the items inside FILES which names match the shell pattern",
+    )
+    depth_group = rm_parser.add_mutually_exclusive_group()
+    depth_group.add_argument(
+        "--max-depth",
+        type=int,
+        default=1,
+        metavar="N",
+        help="search the matched items up to N levels below FILES, 0 means no limit",
+    )
+    depth_group.add_argument(
+        "-R",
+        "--recursive",
+        action="store_const",
+        const=0,
+        dest="max_depth",
+        help="search the matched items at any depth below FILES",
+    )
     rm_parser.add_argument(
         "-f",
         "--force",
@@ -199,8 +360,41 @@ def main() -> None:  # pylint: disable=too-many-statements
 
     # Step -- 6.
     show_parser = group.add_parser("show", parents=[settings_parser, logger_parser])
-    show_parser.add_argument("--limit", default=20, type=int)
+    show_parser.add_argument(
+        "--limit", default=20, type=int, help="the number of entries per page, 0 shows all"
+    )
     show_parser.add_argument("--page", default=1, type=int)
+    show_parser.add_argument(
+        "--format",
+        choices=history.OUTPUT_FORMATS,
+        default="table",
+        help="the table or the machine-readable format which is written row by row",
+    )
+    show_parser.add_argument(
+        "--sort", choices=entries.SORT_FIELDS, help="the field the entries are ordered by"
+    )
+    show_parser.add_argument(
+        "--reverse",
+        action="store_true",
+        default=False,
+        help="show the entries in the descending order",
+    )
+    show_parser.add_argument(
+        "--since",
+        type=timestamp,
+        help="show the entries trashed since this time (e.g. 1h, 2d or 2022-11-14)",
+    )
+    show_parser.add_argument(
+        "--until",
+        type=timestamp,
+        help="show the entries trashed before this time (e.g. 1h, 2d or 2022-11-14)",
+    )
+    show_parser.add_argument(
+        "--origin-prefix", type=abspath, help="show the entries trashed from this location"
+    )
+    show_parser.add_argument(
+        "--name-glob", help="show the entries which names match this shell pattern"
+    )
     show_parser.set_defaults(func=show)
 
     # Step -- 7.
@@ -217,6 +411,12 @@ def main() -> None:  # pylint: disable=too-many-statements
     bucket_group = bucket_parser.add_mutually_exclusive_group(required=True)
     bucket_group.add_argument("--cleanup", action="store_true", default=False)
     bucket_group.add_argument("--create", action="store_true", default=False)
+    bucket_group.add_argument(
+        "--recount",
+        action="store_true",
+        default=False,
+        help="rebuild the bucket's size ledger from the bucket content",
+    )
     bucket_parser.set_defaults(func=maintain_bucket)
 
     try:
@@ -227,25 +427,48 @@ def main() -> None:  # pylint: disable=too-many-statements
         if arguments.dry_run:
             logger.setLevel(logging.INFO)
 
+        # The records of the verbose commands are written by the background thread.
+        if logger.isEnabledFor(logging.INFO):
+            setup_queue(arguments.aggregate_every, arguments.aggregate_interval)
+
+        if arguments.profile or arguments.profile_output:
+            profiler.start(arguments.profile_output)
+
         if arguments.generate_settings:
             settings.generate()
         else:
-            app_settings = arguments.get_settings(arguments)
+            with profiler.phase("settings"):
+                app_settings = arguments.get_settings(arguments)
+            if app_settings.metrics_format != "none":
+                metrics.start(app_settings.metrics_path, app_settings.metrics_format)
+
             app_bucket = bucket.Bucket(
                 path=app_settings.bucket_path,
                 history_path=app_settings.bucket_history_path,
+                history_engine=app_settings.bucket_history_engine,
                 maxsize=app_settings.bucket_size,
                 storetime=app_settings.bucket_storetime,
+                per_device=app_settings.bucket_per_device,
+                eviction=app_settings.bucket_eviction,
+                workers=app_settings.workers,
             )
-            app_bucket.startup()
+            with profiler.phase("startup"):
+                app_bucket.startup()
 
             if hasattr(arguments, "func"):
-                arguments.func(arguments, app_bucket)
+                with profiler.phase("command"):
+                    arguments.func(arguments, app_bucket)
     except KeyboardInterrupt as err:
         logger.error("Stop this program runtime on the current machine.")
         logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
         # Stop this program runtime and return the exit status code.
         sys.exit(getattr(err, "errno", errno.EINTR))
+    finally:
+        # The metrics and the profile are saved even if the command was stopped by an error.
+        metrics.stop()
+        app_profiler = profiler.stop()
+        if app_profiler is not None:
+            sys.stderr.write(app_profiler.format())
 
 
 if __name__ == "__main__":
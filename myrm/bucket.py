@@ -1,18 +1,17 @@
-import collections
-import enum
 import errno
 import io
+import json
 import logging
 import os
-import pickle
+import stat
 import sys
 import time
 import uuid
-from typing import Any, Hashable, List
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
-from prettytable import PrettyTable
-
-from . import rmlib, settings
+from . import metrics, profiler, rmlib, settings, walklib
+from .entries import Entry, Status, _get_short_path
+from .history import HISTORY_ENGINES, BucketHistory, SQLiteBucketHistory
 
 # Create a new instance of the preferred reporting system for this program.
 logger = logging.getLogger("myrm")
@@ -21,300 +20,494 @@ logger = logging.getLogger("myrm")
 __all__ = (
     "Bucket",
     "BucketHistory",
+    "SQLiteBucketHistory",
 )
 
+# The name of the bucket directory created at the mount point of every other filesystem.
+DEVICE_BUCKET_NAME: str = ".myrm-trash-{uid}"
 
-class Status(enum.Enum):
-    CORRECT: str = "Correct"
-    UNKNOWN: str = "Unknown"
-
+# The sort field and the direction of the history index the victims are taken from.
+EVICTION_ORDERS: Dict[str, Tuple[str, bool]] = {
+    "fifo": ("date", False),
+    "largest-first": ("size", True),
+}
 
-Entry = collections.namedtuple("Entry", "status index name path date origin")
 
-
-class BucketHistory(collections.UserDict):
+class Bucket:
     def __init__(
-        self, *args: Any, path: str = settings.DEFAULT_BUCKET_HISTORY_PATH, **kwargs: Any
+        self,
+        path: str = settings.DEFAULT_BUCKET_PATH,
+        history_path: str = settings.DEFAULT_BUCKET_HISTORY_PATH,
+        maxsize: int = settings.DEFAULT_BUCKET_SIZE,
+        storetime: int = settings.DEFAULT_CLEANUP_TIME,
+        history_engine: str = settings.DEFAULT_HISTORY_ENGINE,
+        per_device: bool = settings.DEFAULT_BUCKET_PER_DEVICE,
+        workers: int = settings.DEFAULT_WORKERS,
+        eviction: str = settings.DEFAULT_EVICTION_POLICY,
     ) -> None:
-        super().__init__(*args, **kwargs)
-
         self.path = path
-        # Load the history state from the provided path.
-        if os.path.isfile(path):
-            self._read()
-
-    def __getitem__(self, key: Hashable) -> Entry:
-        return self.data[key]
-
-    def __setitem__(self, key: Hashable, value: Entry) -> None:
-        self.data[key] = value
-        self._write()
-
-    def __delitem__(self, key: Hashable) -> None:
-        del self.data[key]
-        self._write()
-
-    def _read(self) -> None:
+        self.maxsize = maxsize
+        self.eviction = eviction
+        self.storetime = storetime
+        # At least one thread is required to walk through the directory trees.
+        self.workers = max(workers, 1)
+        self.history = HISTORY_ENGINES[history_engine](path=history_path)
+
+        self.per_device = per_device
+        # The bucket directories created on the other filesystems.
+        self.registry_path = f"{history_path}.buckets"
+        self.buckets: List[str] = []
+        self._devices: Dict[int, str] = {}
+        # The paths which are never trashed, including the buckets created later.
+        self._reserved: Set[str] = set()
+
+        if os.path.isfile(self.registry_path):
+            self._read_registry()
+
+        # The snapshot of the bucket which was reconciled at the previous startup.
+        self.state_path = f"{history_path}.state"
+        # The snapshot is refreshed by the commands only once the bucket is in line with it.
+        self._reconciled = False
+
+        # The ledger size is computed only when the metrics are saved.
+        metrics.gauge("myrm_bucket_size_bytes", self.get_size)
+        metrics.gauge("myrm_bucket_maxsize_bytes", lambda: self.maxsize)
+
+    def _read_registry(self) -> None:
         try:
-            with io.open(self.path, mode="rb") as stream_in:
-                # Load and de-serialize the required data structure.
-                self.update(pickle.load(stream_in))
-        except (IOError, OSError) as err:
-            logger.error("It's impossible to restore the history state on the current machine.")
+            with io.open(self.registry_path, mode="rt", encoding="utf-8") as stream_in:
+                self.buckets = json.load(stream_in)
+        except (IOError, OSError, ValueError) as err:
+            logger.error("It's impossible to restore the buckets list on the current machine.")
             logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
             # Stop this program runtime and return the exit status code.
             sys.exit(getattr(err, "errno", errno.EIO))
 
-    def _write(self) -> None:
+    def _write_registry(self) -> None:
+        tmp_path = f"{self.registry_path}.tmp"
+
         try:
-            with io.open(self.path, mode="wb") as stream_out:
-                # Serialize the required data structure and save it on the current machine.
-                pickle.dump(self.data, stream_out, protocol=pickle.HIGHEST_PROTOCOL)
+            # The list is replaced at once, so it's never read partially written.
+            with io.open(tmp_path, mode="wt", encoding="utf-8") as stream_out:
+                json.dump(self.buckets, stream_out, indent=2)
+            os.replace(tmp_path, self.registry_path)
         except (IOError, OSError) as err:
-            logger.error("It's impossible to save the history state on the current machine.")
+            logger.error("It's impossible to save the buckets list on the current machine.")
             logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
             # Stop this program runtime and return the exit status code.
             sys.exit(getattr(err, "errno", errno.EIO))
 
-    def get_indices(self) -> List[int]:
-        return [value.index for value in self.values()]
+    def _read_state(self) -> Dict[str, Any]:
+        try:
+            with io.open(self.state_path, mode="rt", encoding="utf-8") as stream_in:
+                return json.load(stream_in)
+        except (IOError, OSError, ValueError):
+            # The bucket is reconciled again if its snapshot can't be restored.
+            logger.debug("The bucket state can't be restored:", exc_info=True)
+            return {}
+
+    def _write_state(self, state: Dict[str, Any]) -> None:
+        try:
+            with io.open(self.state_path, mode="wt", encoding="utf-8") as stream_out:
+                json.dump(state, stream_out, indent=2)
+        except (IOError, OSError):
+            logger.warning("It's impossible to save the bucket state on the current machine.")
+            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
 
-    def get_next_index(self) -> int:
-        index = 1
-        if len(self.data):
-            index = max(self.get_indices()) + 1
+    def _get_state(self) -> Dict[str, Any]:
+        roots = {}
+        for path in self._get_roots():
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            roots[path] = [info.st_ino, info.st_mtime_ns]
 
-        return index
+        return {"roots": roots, "count": len(self.history), "storetime": self.storetime}
 
-    def cleanup(self, dry_run: bool = False) -> None:
-        if not dry_run:
-            self.data = {}
-            self._write()
+    def _save_state(self) -> None:
+        state = self._get_state()
+        state["expires_at"] = self._get_next_expiry()
+        self._write_state(state)
+        self._reconciled = True
 
-    def get_table(self, page: int = 1, count: int = 10) -> PrettyTable:
-        values = list(self.values())
-        if not values:
-            logger.warning("Show content of the bucket failed because the main bucket is empty.")
-            # Stop this program runtime and return the exit status code.
-            sys.exit(errno.EPERM)
+    def _get_next_expiry(self) -> Optional[float]:
+        trashed_at = self.history.get_oldest()
+        return None if trashed_at is None else trashed_at + self.storetime
 
-        try:
-            pages = [
-                values[index : index + count] for index in range(0, len(values), count)  # noqa
-            ]
-            # Get the required page number.
-            res = [list(item)[:-1] for item in pages[page - 1]]
-        except IndexError as err:
-            logger.error("It's impossible to get the required page number.")
-            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
-            # Stop this program runtime and return the exit status code.
-            sys.exit(getattr(err, "errno", errno.EPERM))
-
-        table = PrettyTable(
-            align="l",
-            field_names=[
-                "Status",
-                "Index",
-                "Name",
-                "Original location",
-                "Trashed on",
-            ],
-        )
-        table.add_rows(res)
+    def _get_bucket_path(self, path: str, dry_run: bool = False) -> str:
+        if not self.per_device or not hasattr(os, "getuid"):
+            return self.path
 
-        return table
+        try:
+            # The symbolic links of the parent directories lead to the device of the item.
+            device = os.stat(os.path.realpath(os.path.dirname(os.path.abspath(path)))).st_dev
+            if device not in self._devices:
+                bucket_path = self._find_bucket_path(path, device, dry_run)
+                if dry_run and not os.path.isdir(bucket_path):
+                    # The bucket which is not created by the dry run is not remembered.
+                    return bucket_path
+                self._devices[device] = bucket_path
+        except OSError:
+            # The item is copied to the main bucket across the devices.
+            logger.debug("The bucket can't be created on the determined device.", exc_info=True)
+            return self.path
+
+        return self._devices[device]
+
+    def _find_bucket_path(self, path: str, device: int, dry_run: bool = False) -> str:
+        if os.stat(self.path).st_dev == device:
+            return self.path
+
+        # Step -- 1.
+        mount = os.path.realpath(os.path.dirname(os.path.abspath(path)))
+        while os.path.dirname(mount) != mount:
+            if os.lstat(os.path.dirname(mount)).st_dev != device:
+                break
+            mount = os.path.dirname(mount)
+
+        # Step -- 2.
+        bucket_path = os.path.join(mount, DEVICE_BUCKET_NAME.format(uid=os.getuid()))
+        if dry_run and not os.path.lexists(bucket_path):
+            return bucket_path
 
+        try:
+            os.mkdir(bucket_path, 0o700)
+            logger.info("Directory '%s' was created.", bucket_path)
+        except FileExistsError:
+            pass
+
+        # Step -- 3.
+        info = os.lstat(bucket_path)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_dev != device:
+            raise OSError(errno.EPERM, "The bucket directory is not trusted.", bucket_path)
+
+        self._reserved.add(os.path.abspath(bucket_path))
+        if bucket_path not in self.buckets:
+            self.buckets.append(bucket_path)
+            self._write_registry()
+
+        return bucket_path
+
+    def _get_roots(self) -> List[str]:
+        # The buckets of the unmounted filesystems are skipped.
+        return [self.path] + [
+            path for path in self.buckets if path != self.path and os.path.isdir(path)
+        ]
+
+    def get_reserved_paths(self) -> Set[str]:
+        """Get the paths of the bucket directories and files which are never trashed.
+
+        The same set is returned every time and the buckets created on the other devices
+        are added to it, so it stays up to date while the items are matched and trashed.
+        """
+        paths = [self.registry_path, self.state_path, *self._get_roots()]
+        for name in ("path", "journal_path", "database_path"):
+            if hasattr(self.history, name):
+                paths.append(getattr(self.history, name))
+        self._reserved.update(os.path.abspath(path) for path in paths)
+        return self._reserved
+
+    def _locate(self, key: str) -> str:
+        return os.path.join(self.history[key].bucket or self.path, key)
+
+    @profiler.timed("delete")
+    def _rm(self, path: str, dry_run: bool = False) -> None:
+        # The symbolic link to a directory is deleted itself without following it.
+        if walklib.isdir(path):
+            rmlib.rmdir(path, dry_run, self.workers)
+        else:
+            rmlib.rm(path, dry_run)
 
-class Bucket:
-    def __init__(
+    def _mv(
         self,
-        path: str = settings.DEFAULT_BUCKET_PATH,
-        history_path: str = settings.DEFAULT_BUCKET_HISTORY_PATH,
-        maxsize: int = settings.DEFAULT_BUCKET_SIZE,
-        storetime: int = settings.DEFAULT_CLEANUP_TIME,
+        path: str,
+        dry_run: bool = False,
+        size: Optional[int] = None,
+        index: Optional[int] = None,
     ) -> None:
-        self.path = path
-        self.maxsize = maxsize
-        self.storetime = storetime
-        self.history = BucketHistory(path=history_path)
+        if size is None:
+            size = self._get_size(path)
 
-    def _rm(self, path: str, dry_run: bool = False) -> None:
-        if os.path.isdir(path):
-            rmlib.rmdir(path, dry_run)
-        else:
-            rmlib.rm(path, dry_run)
+        if index is None:
+            index = self.history.get_next_index()
 
-    def _mv(self, path: str, dry_run: bool = False) -> None:
         origin = os.path.basename(path)
         name = str(uuid.uuid4())
-        date = time.strftime("%H:%M:%S %m-%d-%Y", time.localtime())
-
-        index = self.history.get_next_index()
-
-        if os.path.isdir(path):
-            rmlib.mvdir(path, os.path.join(self.path, name), dry_run)
-        else:
-            rmlib.mv(path, os.path.join(self.path, name), dry_run)
-
-        shorted_path = path
-        if len(path) > 50:
-            # Prevent the terminal stdout from longer item paths.
-            shorted_path = "".join([path[0:15], " ... ", path[len(path) - 30 :]])  # noqa
-
-        self.history[name] = Entry(Status.CORRECT.value, index, origin, shorted_path, date, path)
+        trashed_at = time.time()
 
-    def _get_size(self, path: str) -> int:
-        size = 0
-
-        if os.path.isfile(path) and not os.path.islink(path):
-            try:
-                return os.path.getsize(path)
-            except (OSError, IOError) as err:
-                logger.error("It's impossible to get the size of the determined path.")
-                logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
-                # Stop this program runtime and return the exit status code.
-                sys.exit(getattr(err, "errno", errno.EIO))
+        # The item is renamed inside the same filesystem instead of being copied.
+        bucket_path = self._get_bucket_path(path, dry_run)
+        with profiler.phase("move"):
+            if walklib.isdir(path):
+                rmlib.mvdir(path, os.path.join(bucket_path, name), dry_run, self.workers)
+            else:
+                rmlib.mv(path, os.path.join(bucket_path, name), dry_run)
+
+        # Nothing was moved by the dry run, so the history is not changed.
+        if dry_run:
+            return
+
+        self.history[name] = Entry(
+            Status.CORRECT.value,
+            index,
+            origin,
+            _get_short_path(path),
+            trashed_at,
+            path,
+            size,
+            bucket_path if bucket_path != self.path else None,
+        )
+        metrics.count("trash", size)
 
+    @profiler.timed("size")
+    def _get_size(self, path: str, limit: Optional[int] = None) -> int:
         try:
-            content = os.walk(self.path)
+            return rmlib.getsize(path, limit, self.workers)
         except OSError as err:
-            logger.error("The determined path not exists on the current machine.")
+            logger.error("It's impossible to get the size of the determined path.")
             logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
             # Stop this program runtime and return the exit status code.
-            sys.exit(getattr(err, "errno", errno.EPERM))
-
-        for top, _, nondirs in content:
-            for name in nondirs:
-                abspath = os.path.join(top, name)
-
-                if not os.path.islink(abspath):
-                    try:
-                        size += os.path.getsize(abspath)
-                    except OSError as err:
-                        logger.error("The calculation size for the current item is unavailable.")
-                        logger.debug(
-                            "An unexpected error occurred at this program runtime:", exc_info=True
-                        )
-                        # Stop this program runtime and return the exit status code.
-                        sys.exit(getattr(err, "errno", errno.EPERM))
-
-        return size
+            sys.exit(getattr(err, "errno", errno.EIO))
 
     def create(self, dry_run: bool = False) -> None:
         rmlib.mkdir(self.path, dry_run)
 
+    @metrics.timed("startup")
     def startup(self) -> None:
         self.create()
-        self.check_content()
-        self.timeout_cleanup()
-        self.check_content()
+
+        # Step -- 1.
+        state = self._read_state()
+        expires_at = state.pop("expires_at", None)
+        if state and state == self._get_state() and not self.history.upgraded:
+            if expires_at is None or time.time() < expires_at:
+                logger.debug("The bucket was not changed since the previous startup.")
+                self._reconciled = True
+                return
+
+        # Step -- 2.
+        self.reconcile()
+        if self.history.upgraded:
+            # The previous versions did not record the sizes, so the items are measured once.
+            self.recount()
+            self.history.upgraded = False
+
+        # Step -- 3.
+        self._save_state()
 
     def cleanup(self, dry_run: bool = False) -> None:
-        rmlib.rmdir(self.path, dry_run)
+        for path in self._get_roots():
+            rmlib.rmdir(path, dry_run, self.workers)
         self.create(dry_run)
         self.history.cleanup(dry_run)
 
     def rm(self, path: str, force: bool = False, dry_run: bool = False) -> None:
-        if self.maxsize <= self.get_size() + self._get_size(path):
-            logger.error("The maximum trash bin size has been exceeded.")
-            # Stop this program runtime and return the exit status code.
-            sys.exit(errno.EPERM)
-
-        if not force:
-            self._mv(path, dry_run)
-        elif force:
-            self._rm(path, dry_run)
+        self.rm_many([path], force, dry_run)
+
+    @metrics.timed("rm")
+    def rm_many(self, paths: Iterable[str], force: bool = False, dry_run: bool = False) -> None:
+        paths = list(paths)
+
+        # The quota is reserved for the whole batch before anything is moved.
+        remaining, total, sizes = self.maxsize - self.get_size(), 0, []
+        evict = self.eviction in EVICTION_ORDERS and not force
+        for path in paths:
+            # The measurement is stopped once the batch does not fit the bucket anyway.
+            limit = self.maxsize - total if evict else max(remaining - total, 0)
+            sizes.append(self._get_size(path, limit))
+            total += sizes[-1]
+            if (self.maxsize if evict else remaining) <= total:
+                logger.error("The maximum trash bin size has been exceeded.")
+                # Stop this program runtime and return the exit status code.
+                sys.exit(errno.EPERM)
 
-    def get_size(self) -> int:
-        return self._get_size(self.path)
+        if remaining <= total:
+            self._evict(total - remaining + 1, dry_run)
 
-    def check_content(self) -> None:
-        try:
-            content = os.listdir(self.path)
-        except OSError as err:
-            logger.error("The determined path not exists on the current machine.")
-            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
-            # Stop this program runtime and return the exit status code.
-            sys.exit(getattr(err, "errno", errno.EPERM))
+        if force:
+            for path, size in zip(paths, sizes):
+                self._rm(path, dry_run)
+                if not dry_run:
+                    metrics.count("delete", size)
+        else:
+            index = self.history.get_next_index()
+            with self.history.batch():
+                for offset, (path, size) in enumerate(zip(paths, sizes)):
+                    self._mv(path, dry_run, size, index + offset)
 
-        for name in content:
-            if os.path.islink(os.path.join(self.path, name)):
-                trashed_time = time.localtime()
-            else:
-                trashed_time = time.localtime(os.path.getatime(os.path.join(self.path, name)))
-            date = time.strftime("%H:%M:%S %m-%d-%Y", trashed_time)
+        # The bucket knows its changes, so the next startup is not reconciling it again.
+        if self._reconciled and not dry_run:
+            self._save_state()
 
-            index = self.history.get_next_index()
+    def get_size(self) -> int:
+        return self.history.get_size()
 
-            if name not in list(self.history):
-                self.history[name] = Entry(
-                    Status.UNKNOWN.value,
-                    index,
-                    name,
-                    Status.UNKNOWN.value,
-                    date,
-                    Status.UNKNOWN.value,
-                )
+    def recount(self, dry_run: bool = False) -> int:
+        with self.history.batch():
+            for key in list(self.history):
+                abspath = self._locate(key)
+                if not os.path.lexists(abspath):
+                    continue
 
-        for key in list(self.history):
-            if key not in content:
-                del self.history[key]
+                size = self._get_size(abspath)
+                if self.history[key].size != size and not dry_run:
+                    self.history[key] = self.history[key]._replace(size=size)
 
-    def timeout_cleanup(self) -> None:
-        current_time = time.time()
-        try:
-            content = os.listdir(self.path)
-        except OSError as err:
-            logger.error("The determined path not exists on the current machine.")
-            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
-            # Stop this program runtime and return the exit status code.
-            sys.exit(getattr(err, "errno", errno.EPERM))
+        logger.info("The bucket size was recounted as %s bytes.", self.get_size())
+        return self.get_size()
 
-        for name in content:
-            abspath = os.path.join(self.path, name)
+    def _listdir(self) -> Dict[str, str]:
+        content = {}
 
+        for path in self._get_roots():
             try:
-                trashed_time = time.mktime(
-                    time.strptime(self.history[name].date, "%H:%M:%S %m-%d-%Y")
-                )
+                content.update(dict.fromkeys(os.listdir(path), path))
             except OSError as err:
-                logger.error("Can't detect trashed time for the determined path.")
+                logger.error("The determined path not exists on the current machine.")
                 logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
                 # Stop this program runtime and return the exit status code.
                 sys.exit(getattr(err, "errno", errno.EPERM))
 
-            if (current_time - trashed_time) >= self.storetime:
+        return content
+
+    def _register(self, name: str, path: str) -> None:
+        abspath = os.path.join(path, name)
+
+        # The symbolic link is not followed to get its access time.
+        info = os.lstat(abspath)
+        trashed_at = time.time() if stat.S_ISLNK(info.st_mode) else info.st_atime
+
+        self.history[name] = Entry(
+            Status.UNKNOWN.value,
+            self.history.get_next_index(),
+            name,
+            Status.UNKNOWN.value,
+            trashed_at,
+            Status.UNKNOWN.value,
+            self._get_size(abspath),
+            path if path != self.path else None,
+        )
+
+    def _prune(self, content: Dict[str, str]) -> None:
+        roots = self._get_roots()
+        for key in list(self.history):
+            # The entries of the unmounted filesystems are kept until they come back.
+            if key not in content and (self.history[key].bucket or self.path) in roots:
+                del self.history[key]
+
+    @profiler.timed("reconcile")
+    def reconcile(self) -> None:
+        """Bring the history in line with the bucket content and delete the expired items."""
+        content = self._listdir()
+
+        with self.history.batch():
+            # Step -- 1.
+            for name, path in content.items():
+                if name not in self.history:
+                    self._register(name, path)
+
+            # Step -- 2.
+            self._prune(content)
+
+            # Step -- 3.
+            self._expire(time.time())
+
+    def check_content(self) -> None:
+        content = self._listdir()
+
+        with self.history.batch():
+            for name, path in content.items():
+                if name not in self.history:
+                    self._register(name, path)
+
+            self._prune(content)
+
+    def _expire(self, current_time: float) -> None:
+        roots = self._get_roots()
+
+        for key in self.history.get_expired(current_time - self.storetime):
+            # The items of the unmounted filesystems are deleted once they come back.
+            if (self.history[key].bucket or self.path) not in roots:
+                continue
+
+            abspath = self._locate(key)
+            if os.path.lexists(abspath):
                 self._rm(abspath)
+            metrics.count("expire", self.history[key].size)
+            del self.history[key]
+
+    def _evict(self, size: int, dry_run: bool = False) -> None:
+        """Permanently delete the items in the order of the eviction policy to free the size."""
+        sort, reverse = EVICTION_ORDERS[self.eviction]
+        roots = self._get_roots()
+
+        # Step -- 1.
+        victims, freed = [], 0
+        for key in self.history.iter_keys(sort, reverse):
+            if freed >= size:
+                break
+
+            # The items of the unmounted filesystems can't be deleted, the empty ones free nothing.
+            entry = self.history[key]
+            if entry.size > 0 and (entry.bucket or self.path) in roots:
+                victims.append((key, entry.size))
+                freed += entry.size
+
+        if freed < size:
+            logger.error("The maximum trash bin size has been exceeded.")
+            # Stop this program runtime and return the exit status code.
+            sys.exit(errno.EPERM)
+
+        # Step -- 2.
+        with self.history.batch():
+            for key, victim_size in victims:
+                abspath = self._locate(key)
+                if os.path.lexists(abspath):
+                    self._rm(abspath, dry_run)
+                if not dry_run:
+                    metrics.count("evict", victim_size)
+                    del self.history[key]
+
+        logger.info("%s items (%s bytes) were evicted from the bucket.", len(victims), freed)
+
+    def timeout_cleanup(self) -> None:
+        with self.history.batch():
+            self._expire(time.time())
 
+    @metrics.timed("restore")
     def restore(self, index: int, dry_run: bool = False) -> None:
         if not self.history:
             logger.error("Restore failed because the main bin is empty.")
             # Stop this program runtime and return the exit status code.
             sys.exit(errno.EPERM)
 
-        for key in self.history.keys():  # pylint: disable=consider-using-dict-items
-            if self.history[key].index == index:
-                name = key
-            elif index not in self.history.get_indices():
-                logger.error("Restore failed because the required index '%s' was not found.", index)
-                # Stop this program runtime and return the exit status code.
-                sys.exit(errno.EPERM)
+        name = self.history.get_key(index)
+        if name is None:
+            logger.error("Restore failed because the required index '%s' was not found.", index)
+            # Stop this program runtime and return the exit status code.
+            sys.exit(errno.EPERM)
 
         if self.history[name].status == Status.UNKNOWN.value:
             logger.error("Restore failed because the original location is unknown.")
             # Stop this program runtime and return the exit status code.
             sys.exit(errno.EPERM)
 
-        src = os.path.join(self.path, name)
+        src = self._locate(name)
         dst = self.history[name].origin
         if os.path.exists(dst):
             logger.error("Restore failed because the destination path exists.")
             # Stop this program runtime and return the exit status code.
             sys.exit(errno.EPERM)
 
-        if os.path.isdir(src):
-            rmlib.mvdir(src, dst, dry_run)
-        else:
-            rmlib.mv(src, dst, dry_run)
+        with profiler.phase("move"):
+            if walklib.isdir(src):
+                rmlib.mvdir(src, dst, dry_run, self.workers)
+            else:
+                rmlib.mv(src, dst, dry_run)
 
-        self.check_content()
+        if not dry_run:
+            metrics.count("restore", self.history[name].size)
+            del self.history[name]
+            if self._reconciled:
+                self._save_state()
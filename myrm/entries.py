@@ -0,0 +1,520 @@
+import array
+import collections
+import enum
+import fnmatch
+import functools
+import itertools
+import logging
+import math
+import os
+import time
+import uuid
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+# Create a new instance of the preferred reporting system for this program.
+logger = logging.getLogger("myrm")
+
+
+__all__ = (
+    "Status",
+    "Entry",
+    "EntryColumns",
+    "SORT_FIELDS",
+)
+
+
+class Status(enum.Enum):
+    CORRECT: str = "Correct"
+    UNKNOWN: str = "Unknown"
+
+
+Entry = collections.namedtuple("Entry", "status index name path trashed_at origin size bucket")
+# The size and the bucket were not recorded by the previous versions of the bucket history.
+Entry.__new__.__defaults__ = (0, None)
+
+# The format of the trashed time which is shown to the user.
+DATE_FORMAT: str = "%H:%M:%S %m-%d-%Y"
+
+# The fields the entries are ordered by in the secondary indexes of the history.
+SORT_FIELDS: Tuple[str, ...] = ("name", "date", "size", "origin")
+# The glob characters which end the literal prefix of the name pattern.
+GLOB_CHARACTERS: str = "*?["
+
+
+def _get_trashed_at(date: str) -> Optional[float]:
+    try:
+        return time.mktime(time.strptime(date, DATE_FORMAT))
+    except (OSError, OverflowError, ValueError):
+        # The entry is kept in the bucket until it is deleted by the user.
+        logger.warning("Can't detect trashed time for the determined path.")
+        logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
+        return None
+
+
+def _get_entry_size(value: Any) -> int:
+    return getattr(value, "size", 0)
+
+
+def _get_entry_index(value: Any) -> Optional[int]:
+    return getattr(value, "index", None)
+
+
+def _get_entry_trashed_at(value: Any) -> Optional[float]:
+    return getattr(value, "trashed_at", None)
+
+
+def _get_date(trashed_at: Optional[float]) -> str:
+    if trashed_at is None:
+        return Status.UNKNOWN.value
+    return time.strftime(DATE_FORMAT, time.localtime(trashed_at))
+
+
+def _upgrade_entry(value: Any) -> Any:
+    # The previous versions kept the trashed time as the formatted string.
+    if isinstance(value, Entry) and isinstance(value.trashed_at, str):
+        return value._replace(trashed_at=_get_trashed_at(value.trashed_at))
+    return value
+
+
+def _get_short_path(path: str) -> str:
+    if len(path) > 50:
+        # Prevent the terminal stdout from longer item paths.
+        return "".join([path[0:15], " ... ", path[len(path) - 30 :]])  # noqa
+    return path
+
+
+def _get_glob_prefix(pattern: str) -> str:
+    for position, character in enumerate(pattern):
+        if character in GLOB_CHARACTERS:
+            return pattern[:position]
+    return pattern
+
+
+def _get_directory_prefix(path: str) -> str:
+    # The location matches the items inside it, not the siblings which start with its name.
+    return path if path.endswith(os.sep) else f"{path}{os.sep}"
+
+
+def _is_inside(origin: str, path: str) -> bool:
+    return origin == path or origin.startswith(_get_directory_prefix(path))
+
+
+def _pack_key(key: Any) -> Any:
+    if not isinstance(key, str):
+        return key
+
+    if len(key) == 36:
+        try:
+            packed = uuid.UUID(key)
+        except ValueError:
+            pass
+        else:
+            if str(packed) == key:
+                return packed.bytes
+
+    raw = key.encode("utf-8", "surrogateescape")
+    # The other keys never take 16 bytes, so they are not mistaken for the packed uuid.
+    return raw + b"\0" if len(raw) == 16 else raw
+
+
+def _unpack_key(key: Any) -> Any:
+    if not isinstance(key, bytes):
+        return key
+
+    if len(key) == 16:
+        return str(uuid.UUID(bytes=key))
+    if len(key) == 17 and key.endswith(b"\0"):
+        key = key[:-1]
+    return key.decode("utf-8", "surrogateescape")
+
+
+class EntryColumns(collections.abc.MutableMapping):
+    """The mapping of the history entries which are kept in the compact columns.
+
+    The keys made of uuid are kept as 16 bytes, the numbers are kept in the arrays, the
+    repeated statuses and bucket paths are kept once, and the names and the short paths
+    are computed from the original paths when they are requested; only the rows which
+    differ from them keep their own. The values which are not entries are kept as they are.
+
+    The secondary indexes keep the rows ordered by every sort field. They are built once
+    they are required, saved together with the columns and updated on every change.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self._rows: Dict[Any, int] = {}
+        self._free: List[int] = []
+        self._others: Dict[Any, Any] = {}
+        self._codes: Dict[Any, int] = {}
+        self._values: List[Any] = []
+        self._key: List[Any] = []
+        self._status = array.array("H")
+        self._bucket = array.array("H")
+        self._index = array.array("q")
+        self._size = array.array("q")
+        self._trashed_at = array.array("d")
+        self._origin: List[Optional[str]] = []
+        self._name: Dict[int, str] = {}
+        self._path: Dict[int, str] = {}
+        # The rows ordered by the indices of their entries, so an entry is found by bisection.
+        self._indices: Optional[array.array] = None
+        self._orders: Optional[Dict[str, array.array]] = None
+
+        self.update(*args, **kwargs)
+
+    def __getitem__(self, key: Hashable) -> Any:
+        packed = _pack_key(key)
+        try:
+            row = self._rows[packed]
+        except KeyError:
+            raise KeyError(key) from None
+
+        if row < 0:
+            return self._others[packed]
+
+        return self._get_entry(row)
+
+    def _get_entry(self, row: int) -> Entry:
+        origin = self._origin[row]
+        name, path = self._name.get(row), self._path.get(row)
+        trashed_at = self._trashed_at[row]
+
+        return Entry(
+            self._values[self._status[row]],
+            self._index[row],
+            os.path.basename(origin) if name is None else name,  # type: ignore
+            _get_short_path(origin) if path is None else path,  # type: ignore
+            None if math.isnan(trashed_at) else trashed_at,
+            origin,
+            self._size[row],
+            self._values[self._bucket[row]],
+        )
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        packed = _pack_key(key)
+        row = self._rows.get(packed, -1)
+
+        if not self._is_compact(value):
+            if row >= 0:
+                self._release(row)
+            self._rows[packed] = -1
+            self._others[packed] = value
+            return
+
+        self._others.pop(packed, None)
+        if row < 0:
+            row = self._allocate()
+            self._key[row] = packed
+        else:
+            self._unlink(row)
+            self._forget(row)
+        self._rows[packed] = row
+
+        self._status[row] = self._get_code(value.status)
+        self._bucket[row] = self._get_code(value.bucket)
+        self._index[row] = value.index
+        self._size[row] = value.size
+        self._trashed_at[row] = math.nan if value.trashed_at is None else value.trashed_at
+        self._origin[row] = value.origin
+        self._name.pop(row, None)
+        if value.name != os.path.basename(value.origin):
+            self._name[row] = value.name
+        self._path.pop(row, None)
+        if value.path != _get_short_path(value.origin):
+            self._path[row] = value.path
+        self._link(row)
+        self._remember(row)
+
+    def __delitem__(self, key: Hashable) -> None:
+        packed = _pack_key(key)
+        try:
+            row = self._rows.pop(packed)
+        except KeyError:
+            raise KeyError(key) from None
+
+        if row < 0:
+            del self._others[packed]
+        else:
+            self._release(row)
+
+    def __contains__(self, key: object) -> bool:
+        return _pack_key(key) in self._rows
+
+    def __iter__(self) -> Iterator[Any]:
+        for packed in self._rows:
+            yield _unpack_key(packed)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The released rows are not saved.
+        if self._free:
+            self._compact()
+        self._get_indices()
+        self._get_orders()
+        return self.__dict__
+
+    @staticmethod
+    def _is_compact(value: Any) -> bool:
+        return (
+            isinstance(value, Entry)
+            and isinstance(value.index, int)
+            and isinstance(value.size, int)
+            and isinstance(value.trashed_at, (int, float, type(None)))
+            and isinstance(value.origin, str)
+        )
+
+    def _get_code(self, value: Any) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._values)
+            self._values.append(value)
+        return code
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+
+        for column in (self._status, self._bucket, self._index, self._size):
+            column.append(0)
+        self._trashed_at.append(math.nan)
+        for values in (self._key, self._origin):
+            values.append(None)
+
+        return len(self._key) - 1
+
+    def _get_indices(self) -> array.array:
+        if self._indices is None:
+            rows = [row for row in self._rows.values() if row >= 0]
+            self._indices = array.array("i", sorted(rows, key=self._index.__getitem__))
+        return self._indices
+
+    def _find(self, index: int) -> int:
+        indices = self._get_indices()
+        low, high = 0, len(indices)
+        while low < high:
+            middle = (low + high) // 2
+            if self._index[indices[middle]] < index:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _remember(self, row: int) -> None:
+        # The order of the indices is not kept up to date until it is required.
+        if self._indices is None:
+            return
+
+        index = self._index[row]
+        # The new entries usually get the greatest index, so they are appended.
+        if not self._indices or self._index[self._indices[-1]] <= index:
+            self._indices.append(row)
+        else:
+            self._indices.insert(self._find(index), row)
+
+    def _forget(self, row: int) -> None:
+        if self._indices is None:
+            return
+
+        position = self._find(self._index[row])
+        while self._indices[position] != row:
+            position += 1
+        del self._indices[position]
+
+    def _release(self, row: int) -> None:
+        self._unlink(row)
+        self._forget(row)
+        # The strings of the deleted entry are not kept until the row is reused.
+        self._index[row] = 0
+        for values in (self._key, self._origin):
+            values[row] = None
+        self._name.pop(row, None)
+        self._path.pop(row, None)
+        self._free.append(row)
+
+    def _compact(self) -> None:
+        rows: List[int] = []
+        for packed, row in self._rows.items():
+            if row >= 0:
+                self._rows[packed] = len(rows)
+                rows.append(row)
+
+        for name in ("_status", "_bucket", "_index", "_size", "_trashed_at"):
+            column = getattr(self, name)
+            setattr(self, name, array.array(column.typecode, [column[row] for row in rows]))
+        for name in ("_key", "_origin"):
+            values = getattr(self, name)
+            setattr(self, name, [values[row] for row in rows])
+
+        positions = {row: position for position, row in enumerate(rows)}
+        self._name = {positions[row]: name for row, name in self._name.items()}
+        self._path = {positions[row]: path for row, path in self._path.items()}
+        if self._indices is not None:
+            self._indices = array.array("i", [positions[row] for row in self._indices])
+        if self._orders is not None:
+            for field, order in self._orders.items():
+                self._orders[field] = array.array("i", [positions[row] for row in order])
+
+        self._free = []
+
+    def _get_sort_key(self, field: str, row: int) -> Any:
+        if field == "name":
+            name = self._name.get(row)
+            return os.path.basename(self._origin[row]) if name is None else name  # type: ignore
+        if field == "date":
+            # The entries with the unknown trashed time go first.
+            trashed_at = self._trashed_at[row]
+            return -math.inf if math.isnan(trashed_at) else trashed_at
+        if field == "size":
+            return self._size[row]
+        return self._origin[row]
+
+    def _get_order_key(self, field: str, row: int) -> Tuple[Any, int]:
+        # The equal values are ordered by the indices, so every row has its own position.
+        return self._get_sort_key(field, row), self._index[row]
+
+    def _get_orders(self) -> Dict[str, array.array]:
+        if self._orders is None:
+            rows = [row for row in self._rows.values() if row >= 0]
+            self._orders = {
+                field: array.array(
+                    "i", sorted(rows, key=functools.partial(self._get_order_key, field))
+                )
+                for field in SORT_FIELDS
+            }
+        return self._orders
+
+    def _bisect(self, field: str, value: Any, right: bool = False) -> int:
+        order = self._get_orders()[field]
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            key = self._get_order_key(field, order[middle])
+            if key < value or (right and key == value):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _link(self, row: int) -> None:
+        # The indexes are not kept up to date until they are required.
+        if self._orders is None:
+            return
+
+        for field, order in self._orders.items():
+            order.insert(self._bisect(field, self._get_order_key(field, row), right=True), row)
+
+    def _unlink(self, row: int) -> None:
+        if self._orders is None:
+            return
+
+        for field, order in self._orders.items():
+            position = self._bisect(field, self._get_order_key(field, row))
+            while order[position] != row:
+                position += 1
+            del order[position]
+
+    def _scan(self, field: str, low: Any, inside: Callable[[Any], bool]) -> Iterator[int]:
+        order = self._get_orders()[field]
+        # Only the range of the index which starts from the lowest value is visited.
+        for row in itertools.islice(order, self._bisect(field, (low, -math.inf)), None):
+            if not inside(self._get_sort_key(field, row)):
+                break
+            yield row
+
+    def select(
+        self,
+        sort: Optional[str] = None,
+        reverse: bool = False,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        origin_prefix: Optional[str] = None,
+        name_glob: Optional[str] = None,
+    ) -> Iterator[Entry]:
+        """Iterate over the entries which match the filters in the determined order.
+
+        The rows are taken from the range of the index the filters narrow down the most,
+        and the rest of the filters are checked for every row of this range only.
+        """
+        name_prefix = _get_glob_prefix(name_glob) if name_glob else ""
+        field = sort
+
+        rows: Iterable[int]
+        if origin_prefix:
+            field = "origin"
+            rows = self._scan(field, origin_prefix, lambda key: key.startswith(origin_prefix))
+        elif since is not None or until is not None:
+            field = "date"
+            upper = math.inf if until is None else until
+            rows = self._scan(field, -math.inf if since is None else since, lambda key: key < upper)
+        elif name_prefix:
+            field = "name"
+            rows = self._scan(field, name_prefix, lambda key: key.startswith(name_prefix))
+        elif sort is not None:
+            order = self._get_orders()[sort]
+            rows, reverse = reversed(order) if reverse else order, False
+        else:
+            rows = self._get_indices()
+
+        def matches(row: int) -> bool:
+            trashed_at = self._get_sort_key("date", row)
+            if since is not None and not since <= trashed_at:
+                return False
+            if until is not None and not -math.inf < trashed_at < until:
+                return False
+            if origin_prefix and not _is_inside(self._origin[row], origin_prefix):  # type: ignore
+                return False
+            return not name_glob or fnmatch.fnmatchcase(self._get_sort_key("name", row), name_glob)
+
+        rows = filter(matches, rows)
+        if sort is None and field is not None:
+            # The rows taken from the index of the filter are ordered by their indices again.
+            rows = sorted(rows, key=self._index.__getitem__, reverse=reverse)
+        elif sort is not None and field != sort:
+            rows = sorted(rows, key=functools.partial(self._get_order_key, sort), reverse=reverse)
+        elif reverse:
+            rows = list(rows)[::-1]
+
+        return (self._get_entry(row) for row in rows)
+
+    def iter_keys(self, sort: str, reverse: bool = False) -> Iterator[str]:
+        """Iterate over the keys of the entries in the order of the secondary index."""
+        order = self._get_orders()[sort]
+        for row in reversed(order) if reverse else order:
+            yield _unpack_key(self._key[row])
+
+    def contains_packed(self, packed: Any) -> bool:
+        return packed in self._rows
+
+    def get_key(self, index: int) -> Optional[str]:
+        indices = self._get_indices()
+        position = self._find(index)
+        row = -1
+        if position < len(indices) and self._index[indices[position]] == index:
+            row = indices[position]
+
+        if row >= 0:
+            return _unpack_key(self._key[row])
+
+        for packed, value in self._others.items():
+            if _get_entry_index(value) == index:
+                return _unpack_key(packed)
+
+        return None
+
+    def get_size(self) -> int:
+        size = sum(self._size[row] for row in self._rows.values() if row >= 0)
+        return size + sum(_get_entry_size(value) for value in self._others.values())
@@ -0,0 +1,720 @@
+import collections
+import contextlib
+import csv
+import enum
+import errno
+import heapq
+import io
+import itertools
+import json
+import logging
+import os
+import pickle
+import sys
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
+
+from . import profiler, settings
+from .entries import (
+    SORT_FIELDS,
+    Entry,
+    EntryColumns,
+    Status,
+    _get_date,
+    _get_directory_prefix,
+    _get_entry_index,
+    _get_entry_size,
+    _get_entry_trashed_at,
+    _pack_key,
+    _unpack_key,
+    _upgrade_entry,
+)
+
+if TYPE_CHECKING:
+    # The heavy modules are imported only by the commands which require them.
+    import sqlite3
+
+    from prettytable import PrettyTable
+
+# Create a new instance of the preferred reporting system for this program.
+logger = logging.getLogger("myrm")
+
+
+__all__ = (
+    "Status",
+    "Entry",
+    "EntryColumns",
+    "BucketHistory",
+    "SQLiteBucketHistory",
+    "HISTORY_ENGINES",
+    "OUTPUT_FORMATS",
+    "SORT_FIELDS",
+)
+
+
+# The formats the history is shown in; all of them except the table are written row by row.
+OUTPUT_FORMATS: Tuple[str, ...] = ("table", "json", "ndjson", "tsv")
+# The fields of the entries which are written in the machine-readable formats.
+OUTPUT_FIELDS: Tuple[str, ...] = ("status", "index", "name", "path", "origin", "trashed_at", "size")
+
+# The journal is compacted into a new snapshot once it grows past this size.
+JOURNAL_MAXSIZE: int = 4 * settings.BYTES_TO_MBYTES
+
+
+# The columns of the database table are named after the entry fields.
+SQLITE_COLUMNS: str = "status, idx, name, path, trashed_at, origin, size, bucket"
+SQLITE_INSERT: str = (
+    f"INSERT OR REPLACE INTO history (key, {SQLITE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+# The columns of the database table the entries are sorted by.
+SQLITE_SORT_COLUMNS: Dict[str, str] = {
+    "name": "name",
+    "date": "trashed_at",
+    "size": "size",
+    "origin": "origin",
+}
+SQLITE_TABLE: str = """
+    key TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    trashed_at REAL,
+    origin TEXT NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    bucket TEXT
+"""
+SQLITE_SCHEMA: str = f"""
+CREATE TABLE IF NOT EXISTS history ({SQLITE_TABLE});
+CREATE INDEX IF NOT EXISTS history_idx ON history (idx);
+CREATE INDEX IF NOT EXISTS history_name ON history (name);
+CREATE INDEX IF NOT EXISTS history_origin ON history (origin);
+CREATE INDEX IF NOT EXISTS history_trashed_at ON history (trashed_at);
+CREATE INDEX IF NOT EXISTS history_size ON history (size);
+CREATE TABLE IF NOT EXISTS ledger (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO ledger (id, size) SELECT 0, COALESCE(SUM(size), 0) FROM history;
+CREATE TRIGGER IF NOT EXISTS ledger_insert AFTER INSERT ON history BEGIN
+    UPDATE ledger SET size = size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS ledger_delete AFTER DELETE ON history BEGIN
+    UPDATE ledger SET size = size - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS ledger_update AFTER UPDATE OF size ON history BEGIN
+    UPDATE ledger SET size = size - OLD.size + NEW.size;
+END;
+CREATE TABLE IF NOT EXISTS counter (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    next_index INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counter (id, next_index) SELECT 0, COALESCE(MAX(idx), 0) + 1 FROM history;
+CREATE TRIGGER IF NOT EXISTS counter_insert AFTER INSERT ON history BEGIN
+    UPDATE counter SET next_index = MAX(next_index, NEW.idx + 1);
+END;
+"""
+
+
+class Operation(enum.Enum):
+    PUT: str = "put"
+    DELETE: str = "delete"
+
+
+Record = Tuple[str, Hashable, Optional[Entry]]
+
+
+class BucketHistory(collections.UserDict):
+    data: EntryColumns  # type: ignore
+
+    def __init__(
+        self,
+        *args: Any,
+        path: str = settings.DEFAULT_BUCKET_HISTORY_PATH,
+        journal_maxsize: int = JOURNAL_MAXSIZE,
+        **kwargs: Any,
+    ) -> None:
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.journal_maxsize = journal_maxsize
+        self.journal_size = 0
+        self._size = 0
+        self._records: Optional[List[Record]] = None
+        # The indices are never reused, so the counter only grows until the cleanup.
+        self._next_index = 1
+        # The min-heap of the trashed times which may keep the outdated items.
+        self._expiry: List[Tuple[float, Any]] = []
+        # The entries upgraded from the previous versions have no recorded size.
+        self.upgraded = False
+
+        super().__init__()
+        self.data = EntryColumns()
+        if args or kwargs:
+            self.update(*args, **kwargs)
+
+        # Load the history state from the provided path.
+        if os.path.isfile(path):
+            self._read()
+
+    def __getitem__(self, key: Hashable) -> Entry:
+        return self.data[key]
+
+    def __setitem__(self, key: Hashable, value: Entry) -> None:
+        self._put(key, value)
+        self._commit((Operation.PUT.value, key, value))
+
+    def __delitem__(self, key: Hashable) -> None:
+        self._pop(key)
+        self._commit((Operation.DELETE.value, key, None))
+
+    def _put(self, key: Hashable, value: Entry, expiry: bool = True) -> None:
+        if key in self.data:
+            # The entry is updated in place, so it keeps its position in the trashed order.
+            previous = self.data[key]
+            self._size -= _get_entry_size(previous)
+            if _get_entry_trashed_at(previous) == _get_entry_trashed_at(value):
+                # The item was updated without being trashed again.
+                expiry = False
+            elif expiry:
+                packed = _pack_key(key)
+                self._expiry = [item for item in self._expiry if item[1] != packed]
+                heapq.heapify(self._expiry)
+
+        self.data[key] = value
+        self._size += _get_entry_size(value)
+
+        index = _get_entry_index(value)
+        if index is not None:
+            self._next_index = max(self._next_index, index + 1)
+
+        if expiry:
+            trashed_at = _get_entry_trashed_at(value)
+            if trashed_at is not None:
+                heapq.heappush(self._expiry, (trashed_at, _pack_key(key)))
+
+    def _pop(self, key: Hashable) -> Entry:
+        value = self.data.pop(key)
+        self._size -= _get_entry_size(value)
+        return value
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        """Collect all the changes made inside the context and save them at once."""
+        if self._records is not None:
+            yield
+            return
+
+        self._records = []
+        try:
+            yield
+        finally:
+            records, self._records = self._records, None
+            if records:
+                self._append(*records)
+
+    def _commit(self, record: Record) -> None:
+        if self._records is not None:
+            self._records.append(record)
+        else:
+            self._append(record)
+
+    @profiler.timed("history.load")
+    def _read(self) -> None:
+        try:
+            with io.open(self.path, mode="rb") as stream_in:
+                # Load and de-serialize the required data structure.
+                snapshot = pickle.load(stream_in)
+                upgrade = not isinstance(snapshot, EntryColumns)
+                if upgrade:
+                    # The previous versions kept the entries in the plain dictionary.
+                    for key, value in snapshot.items():
+                        self._put(key, _upgrade_entry(value), expiry=False)
+                else:
+                    self.data = snapshot
+                    self._size = snapshot.get_size()
+
+                try:
+                    self._next_index = max(self._next_index, pickle.load(stream_in))
+                    self._expiry = pickle.load(stream_in)
+                except EOFError:
+                    # The previous versions did not save the index counter and the expiry heap.
+                    pass
+
+                if upgrade:
+                    self._expiry = []
+                    self._expiry = self._get_expiry()
+                    self.upgraded = True
+
+            if os.path.isfile(self.journal_path):
+                self._replay()
+
+            # Save the upgraded entries at once, so they are not converted on every load.
+            if upgrade:
+                self._write()
+        except (IOError, OSError) as err:
+            logger.error("It's impossible to restore the history state on the current machine.")
+            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
+            # Stop this program runtime and return the exit status code.
+            sys.exit(getattr(err, "errno", errno.EIO))
+
+    def _replay(self) -> None:
+        with io.open(self.journal_path, mode="rb") as stream_in:
+            while True:
+                try:
+                    operation, key, value = pickle.load(stream_in)
+                except EOFError:
+                    break
+                except (pickle.UnpicklingError, ValueError):
+                    # The last record was torn by an interrupted write, so drop it.
+                    logger.warning("The history journal is damaged and will be compacted.")
+                    self._write()
+                    return
+
+                if operation == Operation.PUT.value:
+                    self._put(key, value)
+                elif key in self.data:
+                    self._pop(key)
+
+            self.journal_size = stream_in.tell()
+
+        if self.journal_size >= self.journal_maxsize:
+            self._write()
+
+    @profiler.timed("history.save")
+    def _append(self, *records: Record) -> None:
+        # The journal is only meaningful on top of an existing snapshot.
+        if not os.path.isfile(self.path):
+            self._write()
+            return
+
+        payload = b"".join(
+            pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL) for record in records
+        )
+
+        try:
+            with io.open(self.journal_path, mode="ab") as stream_out:
+                stream_out.write(payload)
+        except (IOError, OSError) as err:
+            logger.error("It's impossible to save the history state on the current machine.")
+            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
+            # Stop this program runtime and return the exit status code.
+            sys.exit(getattr(err, "errno", errno.EIO))
+
+        self.journal_size += len(payload)
+        if self.journal_size >= self.journal_maxsize:
+            self._write()
+
+    @profiler.timed("history.save")
+    def _write(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+
+        try:
+            with io.open(tmp_path, mode="wb") as stream_out:
+                # Serialize the required data structure and save it on the current machine.
+                pickle.dump(self.data, stream_out, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(self._next_index, stream_out, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(self._get_expiry(), stream_out, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+
+            # All the journal records are included into the new snapshot.
+            if os.path.isfile(self.journal_path):
+                os.remove(self.journal_path)
+        except (IOError, OSError) as err:
+            logger.error("It's impossible to save the history state on the current machine.")
+            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
+            # Stop this program runtime and return the exit status code.
+            sys.exit(getattr(err, "errno", errno.EIO))
+
+        self.journal_size = 0
+
+    def _get_expiry(self) -> List[Tuple[float, Any]]:
+        if self._expiry:
+            # Drop the items of the deleted entries.
+            expiry = [item for item in self._expiry if self.data.contains_packed(item[1])]
+        else:
+            expiry = []
+            for key, value in self.data.items():
+                trashed_at = _get_entry_trashed_at(value)
+                if trashed_at is not None:
+                    expiry.append((trashed_at, _pack_key(key)))
+
+        # The sorted list is a valid heap as well.
+        return sorted(expiry)
+
+    def _drop_expiry(self) -> None:
+        # The items of the deleted entries are dropped once they reach the top.
+        while self._expiry and not self.data.contains_packed(self._expiry[0][1]):
+            heapq.heappop(self._expiry)
+
+    def get_indices(self) -> List[int]:
+        return [value.index for value in self.values()]
+
+    def get_next_index(self) -> int:
+        return self._next_index
+
+    def get_size(self) -> int:
+        return self._size
+
+    def cleanup(self, dry_run: bool = False) -> None:
+        if not dry_run:
+            self.data = EntryColumns()
+            self._size = 0
+            self._next_index = 1
+            self._expiry = []
+            self._write()
+
+    def get_key(self, index: int) -> Optional[str]:
+        return self.data.get_key(index)
+
+    def get_expired(self, trashed_before: float) -> List[str]:
+        """Get the keys of the entries trashed before the determined time, oldest first."""
+        self._drop_expiry()
+
+        keys: Dict[str, None] = {}
+        # Only the heap items which are not later than the determined time are visited.
+        candidates = [(self._expiry[0][0], 0)] if self._expiry else []
+        while candidates:
+            trashed_at, position = heapq.heappop(candidates)
+            if trashed_at > trashed_before:
+                break
+
+            # The key could be deleted and put again with another trashed time.
+            key = _unpack_key(self._expiry[position][1])
+            if key in self.data and _get_entry_trashed_at(self.data[key]) == trashed_at:
+                keys[key] = None
+
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(self._expiry):
+                    heapq.heappush(candidates, (self._expiry[child][0], child))
+
+        return list(keys)
+
+    def get_oldest(self) -> Optional[float]:
+        """Get the earliest trashed time among all the entries."""
+        self._drop_expiry()
+        return self._expiry[0][0] if self._expiry else None
+
+    def iter_keys(self, sort: str, reverse: bool = False) -> Iterator[str]:
+        """Iterate over the keys of the entries ordered by the field without sorting them."""
+        return self.data.iter_keys(sort, reverse)
+
+    def iter_page(self, page: int = 1, count: int = 10, **query: Any) -> Iterator[Entry]:
+        """Iterate over the entries of the page; all of them are iterated if count is 0.
+
+        The entries are sorted and filtered with the query arguments of EntryColumns.select.
+        """
+        if page < 1 or count < 0:
+            return iter(())
+
+        stop = page * count if count else None
+        if any(value is not None and value is not False for value in query.values()):
+            return itertools.islice(self.data.select(**query), (page - 1) * count, stop)
+
+        # The skipped keys are never turned into entries.
+        keys = itertools.islice(self.data, (page - 1) * count, stop)
+        return (self.data[key] for key in keys)
+
+    def get_page(self, page: int = 1, count: int = 10, **query: Any) -> List[Entry]:
+        if count < 1:
+            return []
+
+        return list(self.iter_page(page, count, **query))
+
+    def _iter_shown(self, page: int, count: int, **query: Any) -> Iterator[Entry]:
+        if not self:
+            logger.warning("Show content of the bucket failed because the main bucket is empty.")
+            # Stop this program runtime and return the exit status code.
+            sys.exit(errno.EPERM)
+
+        values = self.iter_page(page, count, **query)
+        first = next(values, None)
+        if first is None:
+            # The first page is shown empty when no entry matches the filters.
+            if page == 1:
+                return iter(())
+
+            logger.error("It's impossible to get the required page number.")
+            # Stop this program runtime and return the exit status code.
+            sys.exit(errno.EPERM)
+
+        return itertools.chain((first,), values)
+
+    def get_table(self, page: int = 1, count: int = 10, **query: Any) -> "PrettyTable":
+        from prettytable import PrettyTable  # pylint: disable=import-outside-toplevel
+
+        values = self._iter_shown(page, count, **query)
+
+        table = PrettyTable(
+            align="l",
+            field_names=[
+                "Status",
+                "Index",
+                "Name",
+                "Original location",
+                "Trashed on",
+            ],
+        )
+        table.add_rows(
+            [
+                [item.status, item.index, item.name, item.path, _get_date(item.trashed_at)]
+                for item in values
+            ]
+        )
+
+        return table
+
+    def dump(
+        self, stream: TextIO, fmt: str = "ndjson", page: int = 1, count: int = 10, **query: Any
+    ) -> None:
+        """Write the entries of the page to the stream one by one in the determined format."""
+        values = self._iter_shown(page, count, **query)
+        rows = ([getattr(item, field) for field in OUTPUT_FIELDS] for item in values)
+
+        if fmt == "tsv":
+            writer = csv.writer(stream, delimiter="\t", lineterminator="\n")
+            writer.writerow(OUTPUT_FIELDS)
+            writer.writerows(rows)
+        elif fmt == "json":
+            # The array is written item by item instead of being built in memory.
+            separator = "[\n"
+            for row in rows:
+                stream.write(separator)
+                stream.write(json.dumps(dict(zip(OUTPUT_FIELDS, row))))
+                separator = ",\n"
+            stream.write("[]\n" if separator == "[\n" else "\n]\n")
+        elif fmt == "ndjson":
+            for row in rows:
+                stream.write(json.dumps(dict(zip(OUTPUT_FIELDS, row))))
+                stream.write("\n")
+        else:
+            stream.write(f"{self.get_table(page, count, **query)}\n")
+
+
+class SQLiteBucketHistory(BucketHistory):
+    """The bucket history which is kept in the indexed SQLite database."""
+
+    def __init__(  # pylint: disable=super-init-not-called
+        self, path: str = settings.DEFAULT_BUCKET_HISTORY_PATH
+    ) -> None:
+        self.path = path
+        self.database_path = f"{os.path.splitext(path)[0]}.sqlite3"
+        self._batch = False
+        # The entries migrated from the pickled history may have no recorded size.
+        self.upgraded = False
+
+        migrate = not os.path.isfile(self.database_path) and os.path.isfile(path)
+
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        try:
+            self.connection = sqlite3.connect(self.database_path)
+            # The replaced rows must be subtracted from the size ledger as well.
+            self.connection.execute("PRAGMA recursive_triggers = ON")
+            with self.connection:
+                self.connection.executescript(SQLITE_SCHEMA)
+        except sqlite3.Error as err:
+            logger.error("It's impossible to restore the history state on the current machine.")
+            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
+            # Stop this program runtime and return the exit status code.
+            sys.exit(getattr(err, "errno", errno.EIO))
+
+        # Move the legacy pickled history into the database only once.
+        if migrate:
+            self._migrate()
+
+    def __getitem__(self, key: Hashable) -> Entry:
+        row = self._fetchone(f"SELECT {SQLITE_COLUMNS} FROM history WHERE key = ?", (key,))
+        if row is None:
+            raise KeyError(key)
+
+        return Entry(*row)
+
+    def __setitem__(self, key: Hashable, value: Entry) -> None:
+        self._execute(SQLITE_INSERT, [(key, *value)])
+
+    def __delitem__(self, key: Hashable) -> None:
+        if key not in self:
+            raise KeyError(key)
+
+        self._execute("DELETE FROM history WHERE key = ?", [(key,)])
+
+    def __contains__(self, key: object) -> bool:
+        return self._fetchone("SELECT 1 FROM history WHERE key = ?", (key,)) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([row[0] for row in self._fetchall("SELECT key FROM history ORDER BY idx")])
+
+    def __len__(self) -> int:
+        return self._fetchone("SELECT COUNT(*) FROM history")[0]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.database_path!r})"
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        """Run all the changes made inside the context in a single transaction."""
+        if self._batch:
+            yield
+            return
+
+        self._batch = True
+        try:
+            yield
+        finally:
+            self._batch = False
+            self._execute()
+
+    @profiler.timed("history.save")
+    def _execute(self, query: str = "", parameters: Iterable[Tuple[Any, ...]] = ()) -> None:
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        try:
+            if query:
+                self.connection.executemany(query, parameters)
+            if not self._batch:
+                self.connection.commit()
+        except sqlite3.Error as err:
+            self.connection.rollback()
+            logger.error("It's impossible to save the history state on the current machine.")
+            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
+            # Stop this program runtime and return the exit status code.
+            sys.exit(getattr(err, "errno", errno.EIO))
+
+    def _fetchone(self, query: str, parameters: Tuple[Any, ...] = ()) -> Any:
+        return self._query(query, parameters).fetchone()
+
+    def _fetchall(self, query: str, parameters: Tuple[Any, ...] = ()) -> List[Any]:
+        return self._query(query, parameters).fetchall()
+
+    @profiler.timed("history.query")
+    def _query(self, query: str, parameters: Tuple[Any, ...]) -> "sqlite3.Cursor":
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        try:
+            return self.connection.execute(query, parameters)
+        except sqlite3.Error as err:
+            logger.error("It's impossible to restore the history state on the current machine.")
+            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
+            # Stop this program runtime and return the exit status code.
+            sys.exit(getattr(err, "errno", errno.EIO))
+
+    def _migrate(self) -> None:
+        legacy = BucketHistory(path=self.path)
+        self.upgraded = legacy.upgraded
+        self._execute(
+            SQLITE_INSERT,
+            [(key, *value) for key, value in legacy.items()],
+        )
+
+        try:
+            # Fold the journal into the snapshot and keep it as a backup.
+            legacy._write()  # pylint: disable=protected-access
+            os.replace(self.path, f"{self.path}.migrated")
+        except OSError as err:
+            logger.error("It's impossible to migrate the history state on the current machine.")
+            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
+            # Stop this program runtime and return the exit status code.
+            sys.exit(getattr(err, "errno", errno.EIO))
+
+        logger.info("History '%s' was migrated to '%s'.", self.path, self.database_path)
+
+    def get_indices(self) -> List[int]:
+        return [row[0] for row in self._fetchall("SELECT idx FROM history ORDER BY idx")]
+
+    def get_next_index(self) -> int:
+        return self._fetchone("SELECT next_index FROM counter")[0]
+
+    def get_key(self, index: int) -> Optional[str]:
+        row = self._fetchone("SELECT key FROM history WHERE idx = ?", (index,))
+        return row[0] if row is not None else None
+
+    def get_expired(self, trashed_before: float) -> List[str]:
+        rows = self._fetchall(
+            "SELECT key FROM history WHERE trashed_at <= ? ORDER BY trashed_at",
+            (trashed_before,),
+        )
+        return [key for key, in rows]
+
+    def get_oldest(self) -> Optional[float]:
+        return self._fetchone("SELECT MIN(trashed_at) FROM history")[0]
+
+    def iter_keys(self, sort: str, reverse: bool = False) -> Iterator[str]:
+        direction = "DESC" if reverse else "ASC"
+        # The rows are taken from the index of the field while they are iterated.
+        cursor = self._query(
+            f"SELECT key FROM history ORDER BY {SQLITE_SORT_COLUMNS[sort]} {direction}, "
+            f"idx {direction}",
+            (),
+        )
+        return (key for key, in cursor)
+
+    def iter_page(self, page: int = 1, count: int = 10, **query: Any) -> Iterator[Entry]:
+        if page < 1 or count < 0:
+            return iter(())
+
+        where, parameters, order = self._get_where(**query)
+        # The rows are fetched from the cursor while they are iterated; -1 means no limit.
+        cursor = self._query(
+            f"SELECT {SQLITE_COLUMNS} FROM history {where} ORDER BY {order} LIMIT ? OFFSET ?",
+            (*parameters, count or -1, (page - 1) * count),
+        )
+        return (Entry(*row) for row in cursor)
+
+    @staticmethod
+    def _get_where(
+        sort: Optional[str] = None,
+        reverse: bool = False,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        origin_prefix: Optional[str] = None,
+        name_glob: Optional[str] = None,
+    ) -> Tuple[str, Tuple[Any, ...], str]:
+        conditions: List[str] = []
+        parameters: List[Any] = []
+
+        if since is not None:
+            conditions.append("trashed_at >= ?")
+            parameters.append(since)
+        if until is not None:
+            conditions.append("trashed_at < ?")
+            parameters.append(until)
+        if origin_prefix:
+            # The range of the index is searched instead of matching every original path.
+            directory = _get_directory_prefix(origin_prefix)
+            conditions.append("(origin = ? OR (origin >= ? AND origin < ?))")
+            parameters.extend((origin_prefix, directory, f"{directory}\U0010ffff"))
+        if name_glob:
+            conditions.append("name GLOB ?")
+            parameters.append(name_glob)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        column = SQLITE_SORT_COLUMNS[sort] if sort is not None else "idx"
+        direction = "DESC" if reverse else "ASC"
+
+        return where, tuple(parameters), f"{column} {direction}, idx {direction}"
+
+    def get_size(self) -> int:
+        return self._fetchone("SELECT size FROM ledger")[0]
+
+    def cleanup(self, dry_run: bool = False) -> None:
+        if not dry_run:
+            with self.batch():
+                self._execute("DELETE FROM history", [()])
+                self._execute("UPDATE counter SET next_index = 1", [()])
+
+
+HISTORY_ENGINES: Dict[str, Callable[..., BucketHistory]] = {
+    "pickle": BucketHistory,
+    "sqlite": SQLiteBucketHistory,
+}
@@ -1,43 +1,175 @@
+import atexit
 import logging
-import logging.config
 import os
-import tempfile
-import types
-from typing import Any, Mapping
-
-LOGGING_CONFIG: Mapping[str, Any] = types.MappingProxyType(
-    {
-        "formatters": {
-            "default": {
-                "format": "%(asctime)s - %(levelname)s :: %(name)s :: %(message)s",
-                # Use this string to format the creation time of the record.
-                "datefmt": "%Y-%m-%d--%H-%M-%S",
-            },
-        },
-        "handlers": {
-            "console": {
-                "class": "logging.StreamHandler",
-                "formatter": "default",
-                "stream": "ext://sys.stdout",
-            },
-            "logfile": {
-                "class": "logging.FileHandler",
-                "encoding": "utf-8",
-                "filename": os.path.join(tempfile.gettempdir(), "myrm.log"),
-                "formatter": "default",
-                "mode": "at",
-            },
-        },
-        "loggers": {
-            "myrm": {
-                "handlers": ["console", "logfile"],
-            },
-        },
-        # Set the preferred schema version.
-        "version": 1,
-    }
-)
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# The format of the records and of their creation time.
+LOGGING_FORMAT: str = "%(asctime)s - %(levelname)s :: %(name)s :: %(message)s"
+LOGGING_DATEFMT: str = "%Y-%m-%d--%H-%M-%S"
+
+# The listener of the records queue and the handlers it has taken from the "myrm" logger.
+_listener: Optional[Any] = None
+_handlers: List[logging.Handler] = []
+
+
+def get_logfile_path() -> str:
+    # The temporary directory is looked up only when the first record is saved.
+    import tempfile  # pylint: disable=import-outside-toplevel
+
+    return os.path.join(tempfile.gettempdir(), "myrm.log")
+
+
+class DeferredFileHandler(logging.Handler):
+    """The file handler which opens the log file only when the first record is handled.
+
+    The commands which log nothing neither resolve the file path nor open the file.
+    """
+
+    def __init__(self, get_path: Callable[[], str] = get_logfile_path, **kwargs: Any) -> None:
+        super().__init__()
+        self.get_path = get_path
+        self.kwargs = kwargs
+        self.handler: Optional[logging.FileHandler] = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.handler is None:
+            self.handler = logging.FileHandler(self.get_path(), **self.kwargs)
+            self.handler.setFormatter(self.formatter)
+        self.handler.emit(record)
+
+    def close(self) -> None:
+        if self.handler is not None:
+            self.handler.close()
+        super().close()
+
+
+class AggregatingHandler(logging.Handler):
+    """The handler which reports the totals of every operation instead of every item.
+
+    The records with the "operation" attribute (and optionally the "size" one) are
+    counted, and the totals are passed to the target handlers every determined number
+    of items or seconds; all the other records are passed to them as they are.
+    """
+
+    def __init__(
+        self, handlers: List[logging.Handler], every: int = 0, interval: float = 0.0
+    ) -> None:
+        super().__init__()
+        self.handlers = handlers
+        self.every = every
+        self.interval = interval
+        self.totals: Dict[str, List[int]] = {}
+        self.reported_at = time.monotonic()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        operation = getattr(record, "operation", None)
+        if operation is None:
+            self.forward(record)
+            return
+
+        totals = self.totals.setdefault(operation, [0, 0])
+        totals[0] += 1
+        totals[1] += getattr(record, "size", 0)
+
+        if (self.every and totals[0] >= self.every) or (
+            self.interval and time.monotonic() - self.reported_at >= self.interval
+        ):
+            self.flush()
+
+    def forward(self, record: logging.LogRecord) -> None:
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def flush(self) -> None:
+        totals, self.totals = self.totals, {}
+        self.reported_at = time.monotonic()
+
+        for operation, (count, size) in totals.items():
+            record = logging.makeLogRecord(
+                {
+                    "name": "myrm",
+                    "levelno": logging.INFO,
+                    "levelname": logging.getLevelName(logging.INFO),
+                    "msg": "%s items (%s bytes) were processed by the '%s' operation.",
+                    "args": (count, size, operation),
+                }
+            )
+            self.forward(record)
+
+    def close(self) -> None:
+        self.flush()
+        super().close()
 
 
 def setup() -> None:
-    logging.config.dictConfig(config=dict(LOGGING_CONFIG))
+    # The handlers are created directly, so the logging.config module is not imported.
+    formatter = logging.Formatter(LOGGING_FORMAT, datefmt=LOGGING_DATEFMT)
+
+    console = logging.StreamHandler(sys.stdout)
+    logfile = DeferredFileHandler(mode="at", encoding="utf-8")
+    for handler in (console, logfile):
+        handler.setFormatter(formatter)
+
+    logger = logging.getLogger("myrm")
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    for handler in (console, logfile):
+        logger.addHandler(handler)
+
+
+def setup_queue(every: int = 0, interval: float = 0.0) -> None:
+    """Pass the records to the handlers of the "myrm" logger through the background thread.
+
+    The program does not wait for the records to be written. If every or interval is set,
+    the items of every operation are reported in totals by the AggregatingHandler.
+    """
+    # The queue is required by the verbose commands only, so its modules are imported here.
+    import queue  # pylint: disable=import-outside-toplevel
+    from logging.handlers import (  # pylint: disable=import-outside-toplevel
+        QueueHandler,
+        QueueListener,
+    )
+
+    global _listener  # pylint: disable=global-statement
+    if _listener is not None:
+        return
+
+    logger = logging.getLogger("myrm")
+    _handlers[:] = logger.handlers
+    targets: List[logging.Handler] = list(_handlers)
+    if every or interval:
+        targets = [AggregatingHandler(targets, every, interval)]
+
+    records: queue.Queue = queue.Queue()
+    for handler in _handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(records))
+
+    _listener = QueueListener(records, *targets, respect_handler_level=True)
+    _listener.start()
+    # The records left in the queue are written before the program exits.
+    atexit.register(shutdown_queue)
+
+
+def shutdown_queue() -> None:
+    """Write all the queued records and pass the next ones to the handlers directly."""
+    global _listener  # pylint: disable=global-statement
+    if _listener is None:
+        return
+
+    _listener.stop()
+    for handler in _listener.handlers:
+        if isinstance(handler, AggregatingHandler):
+            handler.close()
+    _listener = None
+
+    logger = logging.getLogger("myrm")
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    for handler in _handlers:
+        logger.addHandler(handler)
+    _handlers.clear()
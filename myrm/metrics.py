@@ -0,0 +1,281 @@
+import contextlib
+import functools
+import io
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, cast
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # The metrics file is not locked on the machines without the advisory locks.
+    fcntl = None  # type: ignore
+
+# Create a new instance of the preferred reporting system for this program.
+logger = logging.getLogger("myrm")
+
+
+__all__ = (
+    "METRICS_FORMATS",
+    "Metrics",
+    "count",
+    "gauge",
+    "observe",
+    "record",
+    "start",
+    "stop",
+    "timed",
+)
+
+F = TypeVar("F", bound=Callable[..., Any])
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Labels]
+
+# The formats of the metrics file; nothing is collected with the "none" format.
+METRICS_FORMATS: Tuple[str, ...] = ("none", "prometheus", "json")
+
+# The upper bounds of the latency histograms in seconds.
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+# The help and the type of every metric family in the Prometheus format.
+FAMILIES: Dict[str, Tuple[str, str]] = {
+    "myrm_items_total": ("counter", "The number of the items processed by the operation."),
+    "myrm_bytes_total": ("counter", "The number of the bytes processed by the operation."),
+    "myrm_duration_seconds": ("histogram", "The latency of the bucket method in seconds."),
+    "myrm_bucket_size_bytes": ("gauge", "The size of the bucket ledger in bytes."),
+    "myrm_bucket_maxsize_bytes": ("gauge", "The maximum size of the bucket in bytes."),
+}
+
+# The line of the sample in the Prometheus format, e.g. 'name{label="value"} 1.0'.
+SAMPLE_PATTERN = re.compile(r"^(\w+)(?:\{(.*)\})?\s+(\S+)$")
+LABEL_PATTERN = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+# The metrics of the current program runtime.
+_metrics: Optional["Metrics"] = None
+
+
+def _get_family(name: str) -> str:
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[: -len(suffix)] in FAMILIES:
+            return name[: -len(suffix)]
+    return name
+
+
+def _get_sort_key(item: Tuple[Sample, float]) -> Tuple[str, Labels, float]:
+    # The buckets of every histogram are kept together and ordered by their bounds.
+    (name, labels), _ = item
+    bounds = [float(value) for key, value in labels if key == "le"]
+    return name, tuple(label for label in labels if label[0] != "le"), min(bounds, default=0.0)
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    """The counters, the latency histograms and the gauges of the bucket operations.
+
+    The values are kept in memory and written to the file only once by the write method,
+    so they are cheap to collect on every run. The counters and the histograms of the
+    previous runs are read back from the file and the new values are added to them; the
+    gauges are replaced.
+    """
+
+    def __init__(self, path: str, metrics_format: str = "prometheus") -> None:
+        self.path = path
+        self.format = metrics_format
+        self.samples: Dict[Sample, float] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+
+    def count(self, operation: str, size: int = 0) -> None:
+        labels = (("operation", operation),)
+        self._add(("myrm_items_total", labels), 1)
+        self._add(("myrm_bytes_total", labels), size)
+
+    def observe(self, name: str, seconds: float) -> None:
+        labels = (("method", name),)
+        for bound in LATENCY_BUCKETS:
+            if seconds <= bound:
+                self._add(("myrm_duration_seconds_bucket", labels + (("le", repr(bound)),)), 1)
+        self._add(("myrm_duration_seconds_bucket", labels + (("le", "+Inf"),)), 1)
+        self._add(("myrm_duration_seconds_sum", labels), seconds)
+        self._add(("myrm_duration_seconds_count", labels), 1)
+
+    def gauge(self, name: str, function: Callable[[], float]) -> None:
+        # The gauge is computed only when the metrics are written.
+        self.gauges[name] = function
+
+    def _add(self, sample: Sample, value: float) -> None:
+        # The labels are sorted, so the samples match the ones read from the file.
+        name, labels = sample
+        sample = (name, tuple(sorted(labels)))
+        self.samples[sample] = self.samples.get(sample, 0) + value
+
+    def _read(self) -> Dict[Sample, float]:
+        with io.open(self.path, mode="rt", encoding="utf-8") as stream_in:
+            if self.format == "json":
+                return {
+                    (item["name"], tuple(sorted(item["labels"].items()))): item["value"]
+                    for item in json.load(stream_in)
+                }
+
+            samples = {}
+            for line in stream_in:
+                match = SAMPLE_PATTERN.match(line.strip())
+                if match is None or line.startswith("#"):
+                    continue
+                name, labels, value = match.groups()
+                samples[name, tuple(sorted(LABEL_PATTERN.findall(labels or "")))] = float(value)
+            return samples
+
+    def get_samples(self) -> Dict[Sample, float]:
+        """Get the values of this runtime added to the values saved in the metrics file."""
+        samples: Dict[Sample, float] = {}
+        if os.path.isfile(self.path):
+            try:
+                samples = self._read()
+            except (IOError, OSError, ValueError, KeyError, TypeError):
+                # The counters are started again if the previous values can't be restored.
+                logger.debug("The metrics can't be restored:", exc_info=True)
+
+        for sample, value in self.samples.items():
+            samples[sample] = samples.get(sample, 0) + value
+        for name, function in self.gauges.items():
+            samples[name, ()] = function()
+
+        return samples
+
+    def dumps(self, samples: Dict[Sample, float]) -> str:
+        if self.format == "json":
+            values = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(samples.items(), key=_get_sort_key)
+            ]
+            return json.dumps(values, indent=2) + "\n"
+
+        lines: List[str] = []
+        family = None
+        for (name, labels), value in sorted(samples.items(), key=_get_sort_key):
+            if _get_family(name) != family:
+                family = _get_family(name)
+                metric_type, description = FAMILIES.get(family, ("untyped", ""))
+                lines.append(f"# HELP {family} {description}")
+                lines.append(f"# TYPE {family} {metric_type}")
+            if labels:
+                # The bound of the histogram bucket is written after the other labels.
+                labels = tuple(sorted(labels, key=lambda label: label[0] == "le"))
+                text = ",".join(f'{key}="{label}"' for key, label in labels)
+                name = f"{name}{{{text}}}"
+            lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> None:
+        """Save the metrics to the file at once, so the collectors never read it partially.
+
+        The file is locked from reading the previous values until it is replaced, so the
+        concurrent runs never lose the counters of each other.
+        """
+        dirname = os.path.dirname(self.path)
+
+        try:
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            # The lock is kept in the separate file, because the metrics file is replaced.
+            with io.open(f"{self.path}.lock", mode="ab") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                self._replace(dirname or os.curdir)
+        except (IOError, OSError):
+            logger.warning("It's impossible to save the metrics on the current machine.")
+            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
+
+    def _replace(self, dirname: str) -> None:
+        # The temporary file is created only when the metrics are written.
+        import tempfile  # pylint: disable=import-outside-toplevel
+
+        descriptor, tmp_path = tempfile.mkstemp(
+            prefix=f".{os.path.basename(self.path)}.", suffix=".tmp", dir=dirname
+        )
+        try:
+            with io.open(descriptor, mode="wt", encoding="utf-8") as stream_out:
+                stream_out.write(self.dumps(self.get_samples()))
+            # The collectors usually read the file on behalf of the other user.
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def count(operation: str, size: int = 0) -> None:
+    """Count the item and its bytes processed by the operation if the metrics are collected."""
+    if _metrics is not None:
+        _metrics.count(operation, size)
+
+
+def observe(name: str, seconds: float) -> None:
+    """Add the latency of the named method to its histogram if the metrics are collected."""
+    if _metrics is not None:
+        _metrics.observe(name, seconds)
+
+
+def gauge(name: str, function: Callable[[], float]) -> None:
+    """Set the function which computes the named gauge if the metrics are collected."""
+    if _metrics is not None:
+        _metrics.gauge(name, function)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Add the latency of every call of the decorated function to the named histogram."""
+
+    def decorator(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _metrics is None:
+                return function(*args, **kwargs)
+
+            started_at = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - started_at)
+
+        return cast(F, wrapper)
+
+    return decorator
+
+
+def start(path: str, metrics_format: str = "prometheus") -> Metrics:
+    """Start collecting the metrics; the collected metrics are returned as they are."""
+    if metrics_format not in METRICS_FORMATS[1:]:
+        raise ValueError(f"The metrics format is not supported: {metrics_format!r}")
+
+    global _metrics  # pylint: disable=global-statement
+    if _metrics is None:
+        _metrics = Metrics(path, metrics_format)
+    return _metrics
+
+
+def stop() -> Optional[Metrics]:
+    """Stop collecting the metrics and save them if they were collected."""
+    global _metrics  # pylint: disable=global-statement
+    metrics, _metrics = _metrics, None
+    if metrics is not None:
+        metrics.write()
+    return metrics
+
+
+@contextlib.contextmanager
+def record(path: str, metrics_format: str = "prometheus") -> Iterator[Metrics]:
+    """Collect the metrics of the code inside the context and save them afterwards."""
+    started = _metrics is None
+    metrics = start(path, metrics_format)
+    try:
+        yield metrics
+    finally:
+        # The metrics which were started outside the context are saved there.
+        if started:
+            stop()
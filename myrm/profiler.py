@@ -0,0 +1,219 @@
+import collections
+import contextlib
+import functools
+import io
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, cast
+
+__all__ = (
+    "Profiler",
+    "phase",
+    "profile",
+    "start",
+    "stop",
+    "timed",
+)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# The functions which are counted as the system calls while the program is profiled.
+PROFILED_SYSCALLS: Tuple[Tuple[Any, str], ...] = tuple(
+    (os, name)
+    for name in (
+        "stat",
+        "lstat",
+        "fstat",
+        "open",
+        "close",
+        "read",
+        "write",
+        "lseek",
+        "scandir",
+        "listdir",
+        "mkdir",
+        "rename",
+        "replace",
+        "remove",
+        "unlink",
+        "rmdir",
+        "symlink",
+        "readlink",
+        "chown",
+        "sendfile",
+        "copy_file_range",
+    )
+    if hasattr(os, name)
+) + ((io, "open"),)
+
+# The sets of the functions which support the optional arguments on the current machine.
+SUPPORTS_SETS: Tuple[str, ...] = (
+    "supports_dir_fd",
+    "supports_fd",
+    "supports_effective_ids",
+    "supports_follow_symlinks",
+)
+
+# The profiler of the current program runtime.
+_profiler: Optional["Profiler"] = None
+
+
+class Profiler:
+    """The profiler which times the phases of the command and counts its system calls.
+
+    The phases are nested, so the time of every phase includes the time of the phases
+    inside it. The system calls are counted by wrapping the functions of the os and io
+    modules. If dump_path is set, the cProfile statistics of the main thread are saved
+    there in the pstats format.
+    """
+
+    def __init__(self, dump_path: Optional[str] = None) -> None:
+        self.dump_path = dump_path
+        self.phases: Dict[str, List[float]] = {}
+        self.syscalls: Dict[str, int] = collections.Counter()
+        self.started_at = 0.0
+        self.elapsed = 0.0
+        self._stack: List[str] = []
+        self._lock = threading.Lock()
+        self._patched: List[Tuple[Any, str, Callable[..., Any]]] = []
+        self._profile: Optional[Any] = None
+
+    def _count(self, name: str, function: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            # The items are walked through by several threads at once.
+            with self._lock:
+                self.syscalls[name] += 1
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    def start(self) -> None:
+        for module, name in PROFILED_SYSCALLS:
+            function = getattr(module, name)
+            wrapper = self._count(name if module is os else f"{module.__name__}.{name}", function)
+            # The wrapped functions are to support the same optional arguments.
+            for supports in SUPPORTS_SETS:
+                if function in getattr(os, supports, ()):
+                    getattr(os, supports).add(wrapper)
+            setattr(module, name, wrapper)
+            self._patched.append((module, name, function))
+
+        if self.dump_path is not None:
+            # The profile is required by the dump only, so its module is imported here.
+            import cProfile  # pylint: disable=import-outside-toplevel
+
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+        self.started_at = time.perf_counter()
+
+    def stop(self) -> None:
+        self.elapsed = time.perf_counter() - self.started_at
+
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.dump_path)
+            self._profile = None
+
+        for module, name, function in reversed(self._patched):
+            wrapper = getattr(module, name)
+            for supports in SUPPORTS_SETS:
+                getattr(os, supports, set()).discard(wrapper)
+            setattr(module, name, function)
+        self._patched.clear()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        # The phase which is called inside itself is timed only once.
+        if self._stack and self._stack[-1] == name:
+            yield
+            return
+
+        self._stack.append(name)
+        path = "/".join(self._stack)
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            totals = self.phases.setdefault(path, [0, 0.0])
+            totals[0] += 1
+            totals[1] += time.perf_counter() - started_at
+            self._stack.pop()
+
+    def format(self) -> str:
+        """Get the breakdown of the phases and the system calls as the plain text."""
+        lines = [f"{'Phase':<40} {'Calls':>8} {'Seconds':>10}"]
+        for path, (calls, seconds) in sorted(self.phases.items()):
+            lines.append(f"{path:<40} {int(calls):>8} {seconds:>10.6f}")
+        lines.append(f"{'total':<40} {1:>8} {self.elapsed:>10.6f}")
+
+        lines.append("")
+        lines.append(f"{'System call':<40} {'Calls':>8}")
+        for name, calls in sorted(self.syscalls.items()):
+            lines.append(f"{name:<40} {calls:>8}")
+        lines.append(f"{'total':<40} {sum(self.syscalls.values()):>8}")
+
+        if self.dump_path is not None:
+            lines.append("")
+            lines.append(f"The profile was saved to '{self.dump_path}'.")
+
+        return "\n".join(lines) + "\n"
+
+
+@contextlib.contextmanager
+def _no_phase() -> Iterator[None]:
+    yield
+
+
+def phase(name: str) -> Any:
+    """Time the code inside the context as the named phase if the program is profiled."""
+    if _profiler is None:
+        return _no_phase()
+    return _profiler.phase(name)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Time every call of the decorated function as the named phase."""
+
+    def decorator(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with phase(name):
+                return function(*args, **kwargs)
+
+        return cast(F, wrapper)
+
+    return decorator
+
+
+def start(dump_path: Optional[str] = None) -> Profiler:
+    """Start profiling the program runtime; the running profiler is returned as it is."""
+    global _profiler  # pylint: disable=global-statement
+    if _profiler is None:
+        _profiler = Profiler(dump_path)
+        _profiler.start()
+    return _profiler
+
+
+def stop() -> Optional[Profiler]:
+    """Stop profiling the program runtime and get the profiler if it was started."""
+    global _profiler  # pylint: disable=global-statement
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+@contextlib.contextmanager
+def profile(dump_path: Optional[str] = None) -> Iterator[Profiler]:
+    """Profile the code inside the context and provide the profiler with its results."""
+    started = _profiler is None
+    profiler = start(dump_path)
+    try:
+        yield profiler
+    finally:
+        # The profiler which was started outside the context is stopped there.
+        if started:
+            stop()
@@ -1,13 +1,25 @@
+import concurrent.futures
+import contextlib
+import enum
 import errno
+import io
 import logging
 import os
+import shutil
+import stat
 import sys
+import threading
+from typing import List, Optional, Set, Tuple
+
+from . import walklib
 
 # Create a new instance of the preferred reporting system for this program.
 logger = logging.getLogger("myrm")
 
 
 __all__ = (
+    "Strategy",
+    "getsize",
     "mkdir",
     "rm",
     "rmdir",
@@ -16,11 +28,88 @@ __all__ = (
 )
 
 
+class Strategy(enum.Enum):
+    RENAME: str = "rename"
+    WALK: str = "walk"
+
+
+# The number of threads which are used to walk through wide directory trees.
+DEFAULT_WORKERS: int = walklib.DEFAULT_WORKERS
+
+# The amounts of bytes which are copied across devices by one system call.
+COPY_CHUNKSIZE: int = 1024 * 1024 * 1024
+COPY_BUFSIZE: int = 1024 * 1024
+
+# The errors which mean that the zero-copy system call can't be used for these files.
+ZERO_COPY_ERRORS: Tuple[int, ...] = (
+    errno.EBADF,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTSUP,
+    errno.EOPNOTSUPP,
+    errno.EXDEV,
+)
+
+
+def getsize(path: str, limit: Optional[int] = None, workers: int = DEFAULT_WORKERS) -> int:
+    """Count the bytes of the determined path and stop as soon as the limit is reached."""
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        return info.st_size if stat.S_ISREG(info.st_mode) else 0
+
+    # The hardlinked files are counted only once by their device and inode numbers.
+    seen: Set[Tuple[int, int]] = set()
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def scan(top: str) -> Tuple[int, List[str]]:
+        size = 0
+
+        with walklib.scandir(top) as (_, dirs, nondirs):
+            for entry in nondirs:
+                if stop.is_set():
+                    break
+
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+
+                info = entry.stat(follow_symlinks=False)
+                if info.st_nlink > 1:
+                    with lock:
+                        if (info.st_dev, info.st_ino) in seen:
+                            continue
+                        seen.add((info.st_dev, info.st_ino))
+
+                size += info.st_size
+
+        return size, [entry.name for entry in dirs]
+
+    total = 0
+    with contextlib.closing(walklib.walk(path, scan, workers, stop)) as content:
+        for _, _, size, _ in content:
+            total += size
+            if limit is not None and total >= limit:
+                break
+
+    return total
+
+
+def _get_logged_size(path: str) -> int:
+    # The size is looked up only for the records which are going to be reported.
+    if not logger.isEnabledFor(logging.INFO):
+        return 0
+
+    try:
+        return os.lstat(path).st_size
+    except OSError:
+        return 0
+
+
 def mkdir(path: str, dry_run: bool = False) -> None:
     try:
         if not dry_run:
             os.makedirs(path)
-        logger.info("Directory '%s' was created.", path)
+        logger.info("Directory '%s' was created.", path, extra={"operation": "mkdir"})
     except OSError as err:
         if not (err.errno == errno.EEXIST and os.path.isdir(path)):
             logger.error("Could not create the determined directory.")
@@ -30,10 +119,16 @@ def mkdir(path: str, dry_run: bool = False) -> None:
 
 
 def rm(path: str, dry_run: bool = False) -> None:
+    size = _get_logged_size(path)
+
     try:
         if not dry_run or not os.path.exists(path):
             os.remove(path)
-        logger.info("Item '%s' was deleted from the current machine.", path)
+        logger.info(
+            "Item '%s' was deleted from the current machine.",
+            path,
+            extra={"operation": "rm", "size": size},
+        )
     except OSError as err:
         logger.error("Item's path can not be deleted from the current machine.")
         logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
@@ -41,33 +136,60 @@ def rm(path: str, dry_run: bool = False) -> None:
         sys.exit(getattr(err, "errno", errno.EPERM))
 
 
-def rmdir(path: str, dry_run: bool = False) -> None:
-    try:
-        content = os.walk(path, topdown=False)
-    except OSError as err:
-        logger.error("The determined path not exists on the current machine.")
-        logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
-        # Stop this program runtime and return the exit status code.
-        sys.exit(getattr(err, "errno", errno.EPERM))
+def rmdir(path: str, dry_run: bool = False, workers: int = DEFAULT_WORKERS) -> None:
+    """Delete the determined directory tree with a pool of threads over its subtrees."""
+    stop = threading.Event()
 
-    for top, dirs, nondirs in content:
-        # Step -- 1.
-        for name in nondirs:
-            rm(os.path.join(top, name), dry_run)
+    def scan(top: str) -> Tuple[int, List[str]]:
+        try:
+            with walklib.scandir(top) as (fd, dirs, nondirs):
+                for entry in nondirs:
+                    if stop.is_set():
+                        break
+                    if not dry_run:
+                        _unlink(entry.path, fd)
+        except OSError as err:
+            stop.set()
+            logger.error("The determined path not exists on the current machine.")
+            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
+            # Stop this program runtime and return the exit status code.
+            sys.exit(getattr(err, "errno", errno.EPERM))
+
+        return len(nondirs), [entry.name for entry in dirs]
 
+    def prune(top: str, names: List[str]) -> None:
         try:
-            # Step -- 2.
-            for name in dirs:
-                abspath = os.path.join(top, name)
-                if not dry_run:
-                    os.rmdir(abspath)
-                logger.info("Directory '%s' was deleted from the current machine.", abspath)
+            _rmdirs(top, names)
         except OSError as err:
             logger.error("The determined path can't be deleted from the current machine.")
             logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
             # Stop this program runtime and return the exit status code.
             sys.exit(getattr(err, "errno", errno.EPERM))
 
+    # The directories which contain other directories are grouped by their depth.
+    levels: List[List[Tuple[str, List[str]]]] = []
+    files = dirs = 0
+
+    # Step -- 1.
+    with contextlib.closing(walklib.walk(path, scan, workers, stop)) as content:
+        for top, depth, count, names in content:
+            files += count
+            dirs += len(names)
+
+            if names:
+                while len(levels) <= depth:
+                    levels.append([])
+                levels[depth].append((top, names))
+
+    # Step -- 2.
+    if not dry_run:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            for level in reversed(levels):
+                for _ in executor.map(lambda item: prune(*item), level):
+                    pass
+
+    logger.info("%s files and %s directories were deleted from '%s'.", files, dirs, path)
+
     try:
         if not dry_run or not os.path.exists(path):
             os.rmdir(path)
@@ -80,36 +202,195 @@ def rmdir(path: str, dry_run: bool = False) -> None:
         logger.info("Directory '%s' was deleted from the current machine.", path)
 
 
-def mv(src: str, dst: str, dry_run: bool = False) -> None:
+def _unlink(path: str, dir_fd: Optional[int] = None) -> None:
     try:
-        if not dry_run or not os.path.exists(src):
-            os.rename(src, dst)
-        logger.info("Item '%s' was moved to '%s' as a destinational path.", src, dst)
+        os.unlink(path, dir_fd=dir_fd)
     except OSError as err:
-        logger.error("The determined item can't be moved to the destinational path.")
+        logger.error("Item's path can not be deleted from the current machine.")
         logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
         # Stop this program runtime and return the exit status code.
         sys.exit(getattr(err, "errno", errno.EPERM))
 
 
-def mvdir(src: str, dst: str, dry_run: bool = False) -> None:
+def _rmdirs(top: str, names: List[str]) -> None:
+    if not walklib.supports_dir_fd():
+        for name in names:
+            os.rmdir(os.path.join(top, name))
+        return
+
+    fd = walklib.opendir(top)
     try:
-        content = os.walk(src, topdown=False)
+        for name in names:
+            os.rmdir(name, dir_fd=fd)
+    finally:
+        os.close(fd)
+
+
+def mv(src: str, dst: str, dry_run: bool = False) -> None:
+    size = _get_logged_size(src)
+
+    try:
+        if not dry_run or not os.path.exists(src):
+            try:
+                os.rename(src, dst)
+            except OSError as err:
+                if err.errno != errno.EXDEV:
+                    raise
+
+                # The source is deleted only after its copy has been verified.
+                _copy(src, dst)
+                os.remove(src)
+        logger.info(
+            "Item '%s' was moved to '%s' as a destinational path.",
+            src,
+            dst,
+            extra={"operation": "mv", "size": size},
+        )
     except OSError as err:
-        logger.error("The determined path not exists on the current machine.")
+        logger.error("The determined item can't be moved to the destinational path.")
         logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
         # Stop this program runtime and return the exit status code.
         sys.exit(getattr(err, "errno", errno.EPERM))
 
+
+def mvdir(src: str, dst: str, dry_run: bool = False, workers: int = DEFAULT_WORKERS) -> Strategy:
+    strategy = Strategy.RENAME
+
+    try:
+        if dry_run:
+            # Predict the strategy without touching the file system.
+            if os.path.lexists(dst) or os.lstat(src).st_dev != _get_device(dst):
+                strategy = Strategy.WALK
+        else:
+            os.rename(src, dst)
+    except OSError:
+        # Cross-device moves and merges into existing directories go item by item.
+        logger.debug("The determined directory can't be renamed at once.", exc_info=True)
+        strategy = Strategy.WALK
+
+    if strategy == Strategy.WALK:
+        _mvtree(src, dst, dry_run, workers)
+
+    logger.debug("Directory '%s' was moved using the '%s' strategy.", src, strategy.value)
+    logger.info("Directory '%s' was moved to '%s' as a destinational path.", src, dst)
+    return strategy
+
+
+def _get_device(path: str) -> int:
+    # The path itself does not exist yet, so the nearest existing parent is used.
+    path = os.path.abspath(path)
+    while not os.path.lexists(path):
+        path = os.path.dirname(path)
+
+    return os.lstat(path).st_dev
+
+
+def _mvtree(src: str, dst: str, dry_run: bool = False, workers: int = DEFAULT_WORKERS) -> None:
+    def scan(top: str) -> Tuple[List[str], List[str]]:
+        with walklib.scandir(top) as (_, dirs, nondirs):
+            return [entry.name for entry in nondirs], [entry.name for entry in dirs]
+
     if not dry_run:
-        for top, _, nondirs in content:
-            abspath = top.replace(src, dst)
+        try:
+            # The parent directories are created before their content.
+            content = sorted(walklib.walk(src, scan, workers), key=lambda item: item[1])
+        except OSError as err:
+            logger.error("The determined path not exists on the current machine.")
+            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
+            # Stop this program runtime and return the exit status code.
+            sys.exit(getattr(err, "errno", errno.EPERM))
+
+        dirs: List[Tuple[str, str]] = []
+        nondirs: List[Tuple[str, str]] = []
+        for top, _, names, _ in content:
+            abspath = os.path.normpath(os.path.join(dst, os.path.relpath(top, src)))
 
             # Step -- 1.
+            if not os.path.isdir(abspath):
+                dirs.append((top, abspath))
             mkdir(abspath, dry_run)
 
             # Step -- 2.
-            for name in nondirs:
-                mv(os.path.join(top, name), os.path.join(abspath, name), dry_run)
-        rmdir(src, dry_run)
-    logger.info("Directory '%s' was moved to '%s' as a destinational path.", src, dst)
+            nondirs.extend((os.path.join(top, name), os.path.join(abspath, name)) for name in names)
+
+        # Step -- 3.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            for _ in executor.map(lambda item: mv(*item), nondirs):
+                pass
+
+        # Step -- 4.
+        try:
+            for top, abspath in dirs:
+                shutil.copystat(top, abspath)
+        except OSError:
+            logger.warning("The metadata of the determined directory can't be copied.")
+            logger.debug("An unexpected error occurred at this program runtime:", exc_info=True)
+
+        rmdir(src, dry_run, workers)
+
+
+def _copy(src: str, dst: str) -> None:
+    info = os.lstat(src)
+
+    if stat.S_ISLNK(info.st_mode):
+        os.symlink(os.readlink(src), dst)
+    elif not stat.S_ISREG(info.st_mode):
+        raise OSError(errno.EXDEV, "The determined item can't be copied.", src)
+
+    try:
+        if stat.S_ISREG(info.st_mode):
+            with io.open(src, mode="rb") as stream_in, io.open(dst, mode="wb") as stream_out:
+                _copydata(stream_in.fileno(), stream_out.fileno(), info.st_size)
+
+                if os.fstat(stream_out.fileno()).st_size != info.st_size:
+                    raise OSError(errno.EIO, "The copy of the determined item is incomplete.", dst)
+
+        shutil.copystat(src, dst, follow_symlinks=False)
+        try:
+            os.chown(dst, info.st_uid, info.st_gid, follow_symlinks=False)
+        except PermissionError:
+            # Only the privileged user is able to give the item away.
+            pass
+    except BaseException:
+        # The partial copy is not left behind, so it is never taken for a trashed item.
+        with contextlib.suppress(OSError):
+            os.remove(dst)
+        raise
+
+
+def _copy_file_range(fd_in: int, fd_out: int, offset: int, count: int) -> int:
+    return os.copy_file_range(fd_in, fd_out, count, offset, offset)  # type: ignore
+
+
+def _sendfile(fd_in: int, fd_out: int, offset: int, count: int) -> int:
+    os.lseek(fd_out, offset, os.SEEK_SET)
+    return os.sendfile(fd_out, fd_in, offset, count)
+
+
+def _copydata(fd_in: int, fd_out: int, size: int) -> None:
+    offset = 0
+
+    # Step -- 1.
+    for method in (_copy_file_range, _sendfile):
+        try:
+            while offset < size:
+                copied = method(fd_in, fd_out, offset, min(size - offset, COPY_CHUNKSIZE))
+                if not copied:
+                    break
+                offset += copied
+            return
+        except (AttributeError, OSError) as err:
+            # The zero-copy system calls are not supported between these files.
+            if isinstance(err, OSError) and err.errno not in ZERO_COPY_ERRORS:
+                raise
+
+    # Step -- 2.
+    os.lseek(fd_in, offset, os.SEEK_SET)
+    os.lseek(fd_out, offset, os.SEEK_SET)
+    while True:
+        chunk = memoryview(os.read(fd_in, COPY_BUFSIZE))
+        if not chunk:
+            break
+
+        while chunk:
+            chunk = chunk[os.write(fd_out, chunk) :]  # noqa
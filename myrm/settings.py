@@ -4,9 +4,9 @@ import json
 import logging
 import os
 import sys
-from typing import Any, Dict, Union
+from typing import Any, Dict, Tuple, Union
 
-from . import rmlib
+from . import metrics, rmlib
 
 # Create a new instance of the preferred reporting system for this program.
 logger = logging.getLogger("myrm")
@@ -23,6 +23,15 @@ __all__ = (
     "DEFAULT_BUCKET_HISTORY_PATH",
     "DEFAULT_BUCKET_SIZE",
     "DEFAULT_CLEANUP_TIME",
+    "DEFAULT_BUCKET_PER_DEVICE",
+    "DEFAULT_WORKERS",
+    "HISTORY_ENGINES",
+    "DEFAULT_HISTORY_ENGINE",
+    "EVICTION_POLICIES",
+    "DEFAULT_EVICTION_POLICY",
+    "METRICS_FORMATS",
+    "DEFAULT_METRICS_FORMAT",
+    "DEFAULT_METRICS_PATH",
     "ValidationError",
     "AppSettings",
     "generate",
@@ -47,6 +56,25 @@ DEFAULT_SETTINGS_PATH: str = os.path.join(XDG_CONFIG_HOME, "settings.json")
 DEFAULT_BUCKET_SIZE: int = BYTES_TO_MBYTES * 1024
 DEFAULT_CLEANUP_TIME: int = SECONDS_TO_DAYS * 7
 
+# Keep a bucket directory on every filesystem to move items without copying.
+DEFAULT_BUCKET_PER_DEVICE: bool = True
+
+# The number of threads which walk, move and delete the directory trees.
+DEFAULT_WORKERS: int = rmlib.DEFAULT_WORKERS
+
+# The storages which are able to keep the bucket history.
+HISTORY_ENGINES: Tuple[str, ...] = ("pickle", "sqlite")
+DEFAULT_HISTORY_ENGINE: str = "pickle"
+
+# The order the items are permanently deleted in to admit the new item to the full bucket.
+EVICTION_POLICIES: Tuple[str, ...] = ("none", "fifo", "largest-first")
+DEFAULT_EVICTION_POLICY: str = "none"
+
+# The file where the operational metrics are collected; nothing is collected by default.
+METRICS_FORMATS: Tuple[str, ...] = metrics.METRICS_FORMATS
+DEFAULT_METRICS_FORMAT: str = "none"
+DEFAULT_METRICS_PATH: str = os.path.join(XDG_DATA_HOME, "metrics.prom")
+
 
 class ValidationError(ValueError):
     """This exception will occured when the validation in descriptors was not pass."""
@@ -100,24 +128,59 @@ class BooleanField:
         self.flag = flag
 
 
+class ChoiceField:
+    def __init__(self, choices: Tuple[str, ...]) -> None:
+        self.choices = choices
+        self.choice = choices[0]
+
+    def __get__(self, instance: Any, owner: Any) -> str:
+        return self.choice
+
+    def __set__(self, instance: Any, choice: str) -> None:
+        if choice not in self.choices:
+            raise ValidationError(
+                f"Choice must be one of {self.choices!r} but recieved: {choice!r}."
+            )
+
+        self.choice = choice
+
+
 class AppSettings:
     bucket_path = PathField()
     bucket_history_path = PathField()
+    bucket_history_engine = ChoiceField(HISTORY_ENGINES)
     bucket_size = PositiveIntegerField()
     bucket_storetime = PositiveIntegerField()
+    bucket_per_device = BooleanField()
+    bucket_eviction = ChoiceField(EVICTION_POLICIES)
+    workers = PositiveIntegerField()
+    metrics_format = ChoiceField(METRICS_FORMATS)
+    metrics_path = PathField()
 
     def __init__(
         self,
         bucket_path: str = DEFAULT_BUCKET_PATH,
         bucket_history_path: str = DEFAULT_BUCKET_HISTORY_PATH,
+        bucket_history_engine: str = DEFAULT_HISTORY_ENGINE,
         bucket_size: int = DEFAULT_BUCKET_SIZE,
         bucket_storetime: int = DEFAULT_CLEANUP_TIME,
+        bucket_per_device: bool = DEFAULT_BUCKET_PER_DEVICE,
+        bucket_eviction: str = DEFAULT_EVICTION_POLICY,
+        workers: int = DEFAULT_WORKERS,
+        metrics_format: str = DEFAULT_METRICS_FORMAT,
+        metrics_path: str = DEFAULT_METRICS_PATH,
     ) -> None:
         try:
             self.bucket_path = bucket_path
             self.bucket_history_path = bucket_history_path
+            self.bucket_history_engine = bucket_history_engine
             self.bucket_size = bucket_size
             self.bucket_storetime = bucket_storetime
+            self.bucket_per_device = bucket_per_device
+            self.bucket_eviction = bucket_eviction
+            self.workers = workers
+            self.metrics_format = metrics_format
+            self.metrics_path = metrics_path
         except ValidationError as err:
             logger.error("The validation process was failed: %s", err)
             # Stop this program runtime and return the exit status code.
@@ -130,8 +193,14 @@ class AppSettings:
         return {
             "bucket_path": self.bucket_path,
             "bucket_history_path": self.bucket_history_path,
+            "bucket_history_engine": self.bucket_history_engine,
             "bucket_size": self.bucket_size,
             "bucket_storetime": self.bucket_storetime,
+            "bucket_per_device": self.bucket_per_device,
+            "bucket_eviction": self.bucket_eviction,
+            "workers": self.workers,
+            "metrics_format": self.metrics_format,
+            "metrics_path": self.metrics_path,
         }
 
 
@@ -0,0 +1,151 @@
+import concurrent.futures
+import contextlib
+import os
+import stat
+import threading
+from typing import (
+    Callable,
+    Container,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+    TypeVar,
+)
+
+__all__ = (
+    "DEFAULT_WORKERS",
+    "isdir",
+    "match",
+    "opendir",
+    "scandir",
+    "supports_dir_fd",
+    "walk",
+)
+
+T = TypeVar("T")
+
+# The number of threads which are used to walk through wide directory trees.
+DEFAULT_WORKERS: int = min(32, (os.cpu_count() or 1) + 4)
+
+
+def supports_dir_fd() -> bool:
+    # The relative system calls don't resolve the whole path for every item again.
+    return (
+        os.unlink in os.supports_dir_fd
+        and os.rmdir in os.supports_dir_fd
+        and os.scandir in os.supports_fd
+    )
+
+
+def isdir(path: str) -> bool:
+    """Check if the path is a directory itself and not a symbolic link to it."""
+    try:
+        return stat.S_ISDIR(os.lstat(path).st_mode)
+    except OSError:
+        return False
+
+
+def opendir(path: str, dir_fd: Optional[int] = None) -> int:
+    # The symbolic links are never followed while the directory tree is walked.
+    flags = os.O_RDONLY | os.O_DIRECTORY | getattr(os, "O_NOFOLLOW", 0)
+    return os.open(path, flags, dir_fd=dir_fd)
+
+
+@contextlib.contextmanager
+def scandir(top: str) -> Iterator[Tuple[Optional[int], List[os.DirEntry], List[os.DirEntry]]]:
+    """Read the directory once and split its entries into directories and the rest.
+
+    The entries keep the cached file type and stat data, so the items are not resolved
+    from the root again. Where the platform supports it, the opened directory fd is
+    provided to call the system functions relative to it, and the entry paths are
+    relative to this fd then.
+    """
+    fd = opendir(top) if supports_dir_fd() else None
+    try:
+        # The directory is read at once, so its items can be deleted afterwards.
+        with os.scandir(top if fd is None else fd) as content:  # type: ignore
+            entries = list(content)
+
+        dirs, nondirs = [], []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(entry)
+            else:
+                nondirs.append(entry)
+
+        yield fd, dirs, nondirs
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+
+def walk(
+    top: str,
+    visit: Callable[[str], Tuple[T, List[str]]],
+    workers: int = DEFAULT_WORKERS,
+    stop: Optional[threading.Event] = None,
+) -> Generator[Tuple[str, int, T, List[str]], None, None]:
+    """Visit every directory of the tree on a pool of threads.
+
+    The visitor returns its result and the names of the subdirectories to visit next.
+    The path, depth, result and names are yielded as soon as the directory is visited;
+    the rest of the walk is cancelled and the stop event is set when it is closed.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        pending = {executor.submit(visit, top): (top, 0)}
+
+        try:
+            while pending:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+
+                for future in done:
+                    path, depth = pending.pop(future)
+                    result, names = future.result()
+
+                    for name in names:
+                        abspath = os.path.join(path, name)
+                        pending[executor.submit(visit, abspath)] = (abspath, depth + 1)
+
+                    yield path, depth, result, names
+        finally:
+            # Do not wait for the walk of the rest of the tree.
+            if stop is not None:
+                stop.set()
+            for future in pending:
+                future.cancel()
+
+
+def match(
+    top: str, pattern: Pattern[str], max_depth: int = 1, exclude: Container[str] = ()
+) -> Iterator[str]:
+    """Yield the paths of the items which names fully match the pattern.
+
+    The entries are matched while the directory is read, so the first paths are yielded
+    at once and no directory is listed whole. The matched directories are yielded without
+    being visited; the other ones are visited up to max_depth levels below the top, or at
+    any depth if it is 0. The symbolic links are never followed, the excluded paths are
+    neither yielded nor visited, and the unreadable subdirectories are skipped. The
+    exclusions are checked for every entry, so the paths added to them meanwhile count.
+    """
+    pending = [(top, 1)]
+    while pending:
+        path, depth = pending.pop()
+        try:
+            with os.scandir(path) as content:
+                for entry in content:
+                    if entry.path in exclude:
+                        continue
+                    if pattern.fullmatch(entry.name):
+                        yield entry.path
+                    elif (not max_depth or depth < max_depth) and entry.is_dir(
+                        follow_symlinks=False
+                    ):
+                        pending.append((entry.path, depth + 1))
+        except OSError:
+            if path == top:
+                raise
@@ -23,7 +23,7 @@ setup(
         "Source code": "https://github.com/masteroftheworld/rmlib",
     },
     python_requires=">=3.6",
-    packages=find_packages(exclude=["tests"]),
+    packages=find_packages(exclude=["benchmarks", "tests"]),
     classifiers=[
         "Intended Audience :: Developers",
         "Intended Audience :: System Administrators",
@@ -52,7 +52,7 @@ def fake_entry():
         index=1,
         name="test.txt",
         path="test.txt",
-        date="12:03:12",
+        trashed_at=1668418512.0,
         origin="test.txt",
     )
 
@@ -79,3 +79,18 @@ def fake_boolean():
         flag = settings.BooleanField()
 
     return Mock()
+
+
+@pytest.fixture
+def fake_choice():
+    class Mock:
+        choice = settings.ChoiceField(("first", "second"))
+
+    return Mock()
+
+
+@pytest.fixture
+def fake_sqlite_history(tmp_path):
+    history = bucket.SQLiteBucketHistory(path=str(tmp_path / "history.pkl"))
+    yield history
+    history.connection.close()
@@ -0,0 +1,21 @@
+from benchmarks import suite
+
+
+def test_compare():
+    results = {"rm/10/disk": 1.2, "show/10/disk": 1.3, "startup/10/disk": 0.5}
+    baseline = {"rm/10/disk": 1.0, "show/10/disk": 1.0}
+
+    assert suite.compare(results, baseline, 0.25) == [("show/10/disk", 1.0, 1.3)]
+    assert suite.compare(results, baseline, 0.5) == []
+
+
+def test_run(tmp_path):
+    results = suite.run({"test": str(tmp_path)}, [10], repeat=1)
+
+    assert sorted(results) == [
+        f"{name}/10/test"
+        for name in ("mvdir", "reconcile", "restore", "rm", "rmdir", "show", "startup")
+    ]
+    assert all(seconds >= 0 for seconds in results.values())
+    # The working directories are removed after every suite.
+    assert not list(tmp_path.iterdir())
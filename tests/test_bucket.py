@@ -1,130 +1,15 @@
+import collections
 import errno
 import io
 import os
 import pickle
+import time
 
 import pytest
-from prettytable import PrettyTable
 
 from myrm import bucket
 
 
-def test_delitem_bucket_history(fake_bucket_history):
-    history = {"1": 1, "2": 2, "3": 3}
-    fake_bucket_history.update(history)
-
-    del fake_bucket_history["1"]
-    del fake_bucket_history["2"]
-    assert list(fake_bucket_history.values()) == [3]
-
-    with io.open(fake_bucket_history.path, mode="rb") as stream_in:
-        assert pickle.load(stream_in) == {"3": 3}
-
-
-def test_read_bucket_history(fs):
-    path = "test.pkl"
-    history = {"1": 1, "2": 2, "3": 3}
-    with io.open(path, mode="wb") as stream_out:
-        pickle.dump(history, stream_out, protocol=pickle.HIGHEST_PROTOCOL)
-
-    assert bucket.BucketHistory(path=path) == history
-
-
-def test_read_bucket_history_with_error(fake_bucket_history, mocker):
-    logger_mock = mocker.patch("myrm.bucket.logger")
-    open_mock = mocker.patch("myrm.bucket.io.open")
-    open_mock.side_effect = IOError(errno.EIO, "")
-
-    with pytest.raises(SystemExit) as exit_info:
-        fake_bucket_history._read()
-
-    logger_mock.error.assert_called_with(
-        "It's impossible to restore the history state on the current machine."
-    )
-    assert exit_info.value.code == errno.EIO
-
-
-def test_write_bucket_history(fake_bucket_history):
-    history = {"1": 1, "2": 2, "3": 3}
-    fake_bucket_history.update(history)
-
-    with io.open(fake_bucket_history.path, mode="rb") as stream_in:
-        assert pickle.load(stream_in) == history
-
-
-def test_write_bucket_history_with_error(fake_bucket_history, mocker):
-    logger_mock = mocker.patch("myrm.bucket.logger")
-    open_mock = mocker.patch("myrm.bucket.io.open")
-    open_mock.side_effect = IOError(errno.EIO, "")
-
-    with pytest.raises(SystemExit) as exit_info:
-        fake_bucket_history._write()
-
-    logger_mock.error.assert_called_with(
-        "It's impossible to save the history state on the current machine."
-    )
-    assert exit_info.value.code == errno.EIO
-
-
-def test_get_indices_bucket_history(fake_bucket_history, fake_entry):
-    fake_bucket_history["test"] = fake_entry
-    assert fake_bucket_history.get_indices() == [1]
-
-
-def test_get_next_index_bucket_history(fake_bucket_history, fake_entry):
-    fake_bucket_history["test"] = fake_entry
-    assert fake_bucket_history.get_next_index() == 2
-
-
-def test_bucket_history_cleanup(fake_bucket_history, fake_entry):
-    fake_bucket_history["test"] = fake_entry
-    fake_bucket_history.cleanup(dry_run=False)
-
-    with io.open(fake_bucket_history.path, mode="rb") as stream_in:
-        assert pickle.load(stream_in) == {}
-    assert not len(fake_bucket_history)
-
-
-def test_bucket_history_cleanup_with_dry_run(fake_bucket_history, fake_entry):
-    fake_bucket_history["test"] = fake_entry
-    fake_bucket_history.cleanup(dry_run=True)
-
-    with io.open(fake_bucket_history.path, mode="rb") as stream_in:
-        assert pickle.load(stream_in) == fake_bucket_history
-    assert fake_bucket_history["test"] == fake_entry
-
-
-def test_get_table_bucket_history(fake_bucket_history, fake_entry):
-    fake_bucket_history["test"] = fake_entry
-    table = fake_bucket_history.get_table()
-
-    assert table is not None and isinstance(table, PrettyTable)
-
-
-def test_get_table_bucket_history_with_warning(fake_bucket_history, mocker):
-    logger_mock = mocker.patch("myrm.bucket.logger")
-
-    with pytest.raises(SystemExit) as exit_info:
-        fake_bucket_history.get_table(1, 1)
-
-    logger_mock.warning.assert_called_with(
-        "Show content of the bucket failed because the main bucket is empty."
-    )
-    assert exit_info.value.code == errno.EPERM
-
-
-def test_get_table_bucket_history_with_index_error(fake_bucket_history, fake_entry, mocker):
-    fake_bucket_history["test"] = fake_entry
-
-    logger_mock = mocker.patch("myrm.bucket.logger")
-
-    with pytest.raises(SystemExit) as exit_info:
-        fake_bucket_history.get_table(13, 2)
-
-    logger_mock.error.assert_called_with("It's impossible to get the required page number.")
-    assert exit_info.value.code == errno.EPERM
-
-
 def test_bucket_permanent_rm_file(fake_bucket, fs):
     path = "test.txt"
     fs.create_file(path)
@@ -213,6 +98,69 @@ def test_startup_bucket(fs):
     assert os.listdir(test_bucket.path) == list(test_bucket.history.keys())
 
 
+def test_startup_bucket_without_changes(fake_bucket, mocker):
+    fake_bucket.startup()
+    reconcile_mock = mocker.patch.object(fake_bucket, "reconcile")
+
+    fake_bucket.startup()
+    reconcile_mock.assert_not_called()
+
+
+def test_startup_bucket_with_changes(fake_bucket, fake_entry, mocker):
+    fake_bucket.startup()
+    reconcile_mock = mocker.patch.object(fake_bucket, "reconcile")
+
+    fake_bucket.history["test"] = fake_entry
+    fake_bucket.startup()
+    reconcile_mock.assert_called_once()
+
+
+def test_startup_bucket_after_commands(fake_bucket, fs, mocker):
+    for name in ("first.txt", "second.txt"):
+        fs.create_file(name, contents="test")
+    fake_bucket.startup()
+    reconcile_mock = mocker.patch.object(bucket.Bucket, "reconcile")
+
+    # The snapshot is refreshed by the commands which change the bucket.
+    fake_bucket.rm_many(["first.txt", "second.txt"], force=False, dry_run=False)
+    fake_bucket.restore(1, dry_run=False)
+    bucket.Bucket(path="trash", history_path="history.pkl").startup()
+    reconcile_mock.assert_not_called()
+
+
+def test_startup_bucket_with_expired_items(fake_bucket, fs, mocker):
+    fs.create_file(os.path.join(fake_bucket.path, "test.txt"))
+    fake_bucket.startup()
+    reconcile_mock = mocker.patch.object(fake_bucket, "reconcile")
+
+    mocker.patch("myrm.bucket.time.time", return_value=time.time() + fake_bucket.storetime + 60)
+    fake_bucket.startup()
+    reconcile_mock.assert_called_once()
+
+
+def test_reconcile_bucket(fake_bucket, fake_entry, fs, mocker):
+    fs.create_file(os.path.join(fake_bucket.path, "test.txt"))
+    fake_bucket.history["vanished"] = fake_entry
+    append_mock = mocker.spy(fake_bucket.history, "_append")
+
+    fake_bucket.reconcile()
+
+    assert list(fake_bucket.history) == ["test.txt"]
+    assert fake_bucket.history["test.txt"].status == bucket.Status.UNKNOWN.value
+    append_mock.assert_called_once()
+
+
+def test_reconcile_bucket_with_expired_items(fake_bucket, fs, mocker):
+    path = os.path.join(fake_bucket.path, "test.txt")
+    fs.create_file(path)
+    mocker.patch("myrm.bucket.time.time", return_value=time.time() + fake_bucket.storetime + 60)
+
+    fake_bucket.reconcile()
+
+    assert not os.path.exists(path)
+    assert fake_bucket.history == {}
+
+
 def test_cleanup_bucket(fake_bucket):
     fake_bucket.cleanup(dry_run=False)
     assert os.path.exists(fake_bucket.path) and not len(os.listdir(fake_bucket.path))
@@ -241,6 +189,23 @@ def test_rm_to_bucket_force(fs, fake_bucket):
     assert not os.path.exists(path)
 
 
+def test_rm_to_bucket_force_with_directory_link(fs, fake_bucket):
+    fs.create_file("dir/test.txt")
+    fs.create_symlink("link", "dir")
+
+    fake_bucket.rm("link", force=True, dry_run=False)
+    assert not os.path.lexists("link")
+    assert os.path.exists("dir/test.txt")
+
+
+def test_cleanup_bucket_with_workers(fake_bucket, mocker):
+    rmdir_mock = mocker.patch("myrm.bucket.rmlib.rmdir")
+    fake_bucket.workers = 2
+
+    fake_bucket.cleanup(dry_run=False)
+    rmdir_mock.assert_called_with(fake_bucket.path, False, 2)
+
+
 def test_rm_to_bucket_force_with_dry_run(fs, fake_bucket):
     path = "test.txt"
     fs.create_file(path)
@@ -263,12 +228,51 @@ def test_rm_to_bucket_not_force_with_dry_run(fs, fake_bucket):
 
     fake_bucket.rm(path, force=False, dry_run=True)
     assert os.path.exists(path) and not len(os.listdir(fake_bucket.path))
+    assert not len(fake_bucket.history) and fake_bucket.get_size() == 0
+
+
+def test_rm_many_to_bucket(fs, fake_bucket):
+    paths = ["first.txt", "second.txt", "third"]
+    fs.create_file(paths[0], contents="test")
+    fs.create_file(paths[1], contents="test")
+    fs.create_dir(paths[2])
+
+    fake_bucket.rm_many(paths, force=False, dry_run=False)
+    assert not any(os.path.exists(path) for path in paths)
+    assert sorted(entry.index for entry in fake_bucket.history.values()) == [1, 2, 3]
+    assert fake_bucket.get_size() == 8
+    assert not os.path.exists(fake_bucket.history.journal_path)
+
+
+def test_rm_many_to_bucket_force(fs, fake_bucket):
+    paths = ["first.txt", "second"]
+    fs.create_file(paths[0])
+    fs.create_dir(paths[1])
+
+    fake_bucket.rm_many(paths, force=True, dry_run=False)
+    assert not any(os.path.exists(path) for path in paths) and not fake_bucket.history
+
+
+def test_rm_many_to_bucket_with_maxsize_error(fs, fake_bucket, mocker):
+    paths = ["first.txt", "second.txt"]
+    fs.create_file(paths[0], contents="test")
+    fs.create_file(paths[1], contents="test")
+    fake_bucket.maxsize = 6
+
+    logger_mock = mocker.patch("myrm.bucket.logger")
+
+    with pytest.raises(SystemExit) as exit_info:
+        fake_bucket.rm_many(paths, force=False, dry_run=False)
+
+    logger_mock.error.assert_called_with("The maximum trash bin size has been exceeded.")
+    assert exit_info.value.code == errno.EPERM
+    assert all(os.path.exists(path) for path in paths)
 
 
 def test_rm_to_bucket_with_maxsize_error(fake_bucket, mocker):
     fake_bucket.maxsize = 0
 
-    mocker.patch("myrm.bucket.os.path.getsize", return_value=10)
+    mocker.patch("myrm.bucket.rmlib.getsize", return_value=10)
     logger_mock = mocker.patch("myrm.bucket.logger")
 
     with pytest.raises(SystemExit) as exit_info:
@@ -283,16 +287,68 @@ def test_get_size_bucket(fake_bucket, fs):
     fs.create_file(path, contents="test")
 
     fake_bucket.rm(path, force=False, dry_run=False)
-    assert fake_bucket.get_size() > 0
+    assert fake_bucket.get_size() == 4
+
+
+def test_get_size_bucket_after_restore(fake_bucket, fs):
+    fs.create_file("first.txt", contents="test")
+    fs.create_file("second.txt", contents="test")
+
+    fake_bucket.rm("first.txt", force=False, dry_run=False)
+    fake_bucket.rm("second.txt", force=False, dry_run=False)
+    fake_bucket.restore(1, dry_run=False)
+    assert fake_bucket.get_size() == 4
+
+
+def test_recount_bucket(fake_bucket, fs):
+    fs.create_file(os.path.join(fake_bucket.path, "test.txt"), contents="test")
+    fake_bucket.check_content()
+    fake_bucket.history["test.txt"] = fake_bucket.history["test.txt"]._replace(size=0)
+
+    fake_bucket.recount(dry_run=True)
+    assert fake_bucket.get_size() == 0
+
+    assert fake_bucket.recount(dry_run=False) == 4
+
+
+def test_recount_bucket_keeps_order(fake_bucket, fs):
+    for name in ("first.txt", "second.txt"):
+        fs.create_file(os.path.join(fake_bucket.path, name), contents="test")
+        fake_bucket.check_content()
+    fake_bucket.history["first.txt"] = fake_bucket.history["first.txt"]._replace(size=0)
+
+    fake_bucket.recount(dry_run=False)
+
+    assert list(fake_bucket.history) == ["first.txt", "second.txt"]
+    assert [entry.index for entry in fake_bucket.history.iter_page(count=0)] == [1, 2]
+    assert fake_bucket.get_size() == 8
+
+
+def test_startup_bucket_with_legacy_history(fs, monkeypatch):
+    fs.create_file(os.path.join("trash", "test"), contents="test")
+
+    # The baseline versions kept the plain dictionary of the entries without the size.
+    legacy_entry = collections.namedtuple("Entry", "status index name path date origin")
+    legacy_entry.__module__ = bucket.__name__
+    monkeypatch.setattr(bucket, "Entry", legacy_entry)
+    date = time.strftime("%H:%M:%S %m-%d-%Y", time.localtime())
+    with io.open("history.pkl", mode="wb") as stream_out:
+        entry = legacy_entry("Correct", 1, "test.txt", "test.txt", date, "test.txt")
+        pickle.dump({"test": entry}, stream_out, protocol=pickle.HIGHEST_PROTOCOL)
+    monkeypatch.undo()
+
+    test_bucket = bucket.Bucket(path="trash", history_path="history.pkl")
+    assert test_bucket.get_size() == 0
+
+    test_bucket.startup()
+    assert test_bucket.get_size() == 4 and not test_bucket.history.upgraded
+    assert bucket.Bucket(path="trash", history_path="history.pkl").get_size() == 4
 
 
 def test_get_size_with_not_impossible_error(fake_bucket, mocker):
     logger_mock = mocker.patch("myrm.bucket.logger")
-    get_size_mock = mocker.patch("os.path.getsize")
-    get_size_mock.side_effect = IOError(errno.EIO, "")
-
-    mocker.patch("myrm.bucket.os.path.isfile", return_value=True)
-    mocker.patch("myrm.bucket.os.path.islink", return_value=False)
+    getsize_mock = mocker.patch("myrm.bucket.rmlib.getsize")
+    getsize_mock.side_effect = IOError(errno.EIO, "")
 
     with pytest.raises(SystemExit) as exit_info:
         fake_bucket._get_size("test.txt")
@@ -301,33 +357,25 @@ def test_get_size_with_not_impossible_error(fake_bucket, mocker):
     assert exit_info.value.code == errno.EIO
 
 
-def test_get_size_bucket_with_not_exists_error(mocker):
-    test_bucket = bucket.Bucket("")
-
+def test_get_size_bucket_with_not_exists_error(fake_bucket, mocker):
     logger_mock = mocker.patch("myrm.bucket.logger")
-    walk_mock = mocker.patch("myrm.bucket.os.walk")
-    walk_mock.side_effect = OSError(errno.EPERM, "")
 
     with pytest.raises(SystemExit) as exit_info:
-        test_bucket.get_size()
+        fake_bucket._get_size("test")
 
-    logger_mock.error.assert_called_with("The determined path not exists on the current machine.")
-    assert exit_info.value.code == errno.EPERM
+    logger_mock.error.assert_called_with("It's impossible to get the size of the determined path.")
+    assert exit_info.value.code == errno.ENOENT
 
 
-def test_get_size_bucket_with_abspath_error(fake_bucket, fs, mocker):
-    fs.create_file(os.path.join(fake_bucket.path, "test.txt"))
-    logger_mock = mocker.patch("myrm.bucket.logger")
-    getsize_mock = mocker.patch("myrm.bucket.os.path.getsize")
-    getsize_mock.side_effect = OSError(errno.EPERM, "")
+def test_rm_to_bucket_with_maxsize_limit(fake_bucket, fs, mocker):
+    fs.create_file("test.txt", contents="test")
+    fake_bucket.maxsize = 3
+    getsize_mock = mocker.patch("myrm.bucket.rmlib.getsize", return_value=4)
 
-    with pytest.raises(SystemExit) as exit_info:
-        fake_bucket.get_size()
+    with pytest.raises(SystemExit):
+        fake_bucket.rm("test.txt", force=False, dry_run=False)
 
-    logger_mock.error.assert_called_with(
-        "The calculation size for the current item is unavailable."
-    )
-    assert exit_info.value.code == errno.EPERM
+    getsize_mock.assert_called_with("test.txt", 3, fake_bucket.workers)
 
 
 def test_check_content_bucket(fake_bucket, fs):
@@ -379,15 +427,14 @@ def test_timeout_cleanup_bucket(fake_bucket, fs, mocker):
 
     fake_bucket.storetime = 1
     mocker.patch("myrm.settings.SECONDS_TO_DAYS", new=1)
-    mocker.patch("myrm.bucket.time.mktime", return_value=1)
-    mocker.patch("myrm.bucket.time.time", return_value=10)
 
     fake_bucket.check_content()
+    mocker.patch("myrm.bucket.time.time", return_value=time.time() + 10)
     fake_bucket.timeout_cleanup()
     assert before_cleanup_content != os.listdir(fake_bucket.path)
 
 
-def test_timeout_cleanup_bucket_with_not_exists_error(mocker):
+def test_reconcile_bucket_with_not_exists_error(mocker):
     test_bucket = bucket.Bucket("")
 
     logger_mock = mocker.patch("myrm.bucket.logger")
@@ -395,26 +442,39 @@ def test_timeout_cleanup_bucket_with_not_exists_error(mocker):
     listdir_mock.side_effect = OSError(errno.EPERM, "")
 
     with pytest.raises(SystemExit) as exit_info:
-        test_bucket.timeout_cleanup()
+        test_bucket.reconcile()
 
     logger_mock.error.assert_called_with("The determined path not exists on the current machine.")
     assert exit_info.value.code == errno.EPERM
 
 
-def test_timeout_cleanup_bucket_with_trashed_time_error(fake_bucket, fs, mocker):
-    fs.create_file(os.path.join(fake_bucket.path, "test.txt"))
+def test_timeout_cleanup_bucket_with_trashed_time_error(fake_entry, fs, mocker):
+    with io.open("history.pkl", mode="wb") as stream_out:
+        pickle.dump({"test.txt": fake_entry._replace(trashed_at="12:03:12")}, stream_out)
+    path = os.path.join("trash", "test.txt")
+    fs.create_file(path)
 
-    logger_mock = mocker.patch("myrm.bucket.logger")
-    gettime_mock = mocker.patch("myrm.bucket.time.mktime")
-    gettime_mock.side_effect = OSError(errno.EPERM, "")
+    logger_mock = mocker.patch("myrm.entries.logger")
+    test_bucket = bucket.Bucket(path="trash", history_path="history.pkl")
+    test_bucket.timeout_cleanup()
+
+    logger_mock.warning.assert_called_with("Can't detect trashed time for the determined path.")
+    assert os.path.exists(path) and test_bucket.history["test.txt"].trashed_at is None
 
+
+def test_timeout_cleanup_bucket_only_due_entries(fake_bucket, fs, mocker):
+    for name in ("old.txt", "new.txt"):
+        fs.create_file(os.path.join(fake_bucket.path, name))
     fake_bucket.check_content()
+    fake_bucket.history["old.txt"] = fake_bucket.history["old.txt"]._replace(
+        trashed_at=time.mktime((2000, 1, 1, 0, 0, 0, 0, 0, -1))
+    )
+    rm_mock = mocker.spy(fake_bucket, "_rm")
 
-    with pytest.raises(SystemExit) as exit_info:
-        fake_bucket.timeout_cleanup()
+    fake_bucket.timeout_cleanup()
 
-    logger_mock.error.assert_called_with("Can't detect trashed time for the determined path.")
-    assert exit_info.value.code == errno.EPERM
+    rm_mock.assert_called_once_with(os.path.join(fake_bucket.path, "old.txt"))
+    assert list(fake_bucket.history) == ["new.txt"]
 
 
 def test_restore_file_from_bucket(fake_bucket, fs):
@@ -511,3 +571,193 @@ def test_restore_with_path_exists_error(fake_bucket, fs, mocker):
 
     logger_mock.error.assert_called_with("Restore failed because the destination path exists.")
     assert exit_info.value.code == errno.EPERM
+
+
+def test_restore_from_bucket_with_sqlite_history(tmp_path):
+    test_bucket = bucket.Bucket(
+        path=str(tmp_path / "trash"),
+        history_path=str(tmp_path / "history.pkl"),
+        history_engine="sqlite",
+    )
+    test_bucket.create(dry_run=False)
+
+    path = str(tmp_path / "test.txt")
+    io.open(path, mode="wt", encoding="utf-8").close()
+
+    test_bucket.rm(path, force=False, dry_run=False)
+    assert not os.path.exists(path) and len(test_bucket.history) == 1
+
+    test_bucket.restore(1, dry_run=False)
+    assert os.path.exists(path) and not len(test_bucket.history)
+
+
+def test_get_reserved_paths(fake_bucket):
+    paths = fake_bucket.get_reserved_paths()
+
+    for path in (fake_bucket.path, fake_bucket.history.path, fake_bucket.history.journal_path):
+        assert os.path.abspath(path) in paths
+    assert os.path.abspath(fake_bucket.state_path) in paths
+
+
+def test_get_reserved_paths_with_device_bucket(fs, fake_bucket):
+    fs.add_mount_point("/data")
+    fs.create_file("/data/test.txt")
+    paths = fake_bucket.get_reserved_paths()
+
+    # The bucket created while the items are trashed is reserved as well.
+    fake_bucket.rm("/data/test.txt", force=False, dry_run=False)
+    assert f"/data/.myrm-trash-{os.getuid()}" in paths
+
+
+@pytest.fixture
+def full_bucket(tmp_path, request):
+    test_bucket = bucket.Bucket(
+        path=str(tmp_path / "trash"),
+        history_path=str(tmp_path / "history.pkl"),
+        history_engine=request.param,
+        maxsize=16,
+    )
+    test_bucket.create(dry_run=False)
+
+    for name, contents in (("old.txt", "test"), ("empty.txt", ""), ("big.txt", "test" * 2)):
+        path = tmp_path / name
+        path.write_text(contents)
+        test_bucket.rm(str(path), force=False, dry_run=False)
+
+    (tmp_path / "new.txt").write_text("test12")
+    return test_bucket
+
+
+@pytest.mark.parametrize("full_bucket", ["pickle", "sqlite"], indirect=True)
+@pytest.mark.parametrize(
+    "eviction, evicted",
+    [("fifo", "old.txt"), ("largest-first", "big.txt")],
+)
+def test_rm_to_full_bucket_with_eviction(full_bucket, tmp_path, eviction, evicted):
+    full_bucket.eviction = eviction
+
+    full_bucket.rm(str(tmp_path / "new.txt"), force=False, dry_run=False)
+
+    names = {"old.txt", "empty.txt", "big.txt", "new.txt"} - {evicted}
+    assert {entry.name for entry in full_bucket.history.values()} == names
+    assert len(os.listdir(full_bucket.path)) == 3
+    assert full_bucket.get_size() < full_bucket.maxsize
+
+
+@pytest.mark.parametrize("full_bucket", ["pickle"], indirect=True)
+def test_rm_to_full_bucket_with_eviction_and_dry_run(full_bucket, tmp_path):
+    full_bucket.eviction = "fifo"
+
+    full_bucket.rm(str(tmp_path / "new.txt"), force=False, dry_run=True)
+
+    assert len(full_bucket.history) == 3 and len(os.listdir(full_bucket.path)) == 3
+
+
+@pytest.mark.parametrize("full_bucket", ["pickle"], indirect=True)
+def test_rm_to_full_bucket_with_eviction_error(full_bucket, tmp_path, mocker):
+    full_bucket.eviction = "fifo"
+    full_bucket.maxsize = 14
+    (tmp_path / "new.txt").write_text("test" * 4)
+    logger_mock = mocker.patch("myrm.bucket.logger")
+
+    with pytest.raises(SystemExit) as exit_info:
+        full_bucket.rm(str(tmp_path / "new.txt"), force=False, dry_run=False)
+
+    logger_mock.error.assert_called_with("The maximum trash bin size has been exceeded.")
+    assert exit_info.value.code == errno.EPERM
+    assert len(full_bucket.history) == 3
+
+
+@pytest.mark.parametrize("full_bucket", ["pickle"], indirect=True)
+def test_rm_to_full_bucket_with_unmounted_items(full_bucket, tmp_path, mocker):
+    full_bucket.eviction = "fifo"
+    mocker.patch.object(full_bucket, "_get_roots", return_value=[])
+    mocker.patch("myrm.bucket.logger")
+
+    with pytest.raises(SystemExit):
+        full_bucket.rm(str(tmp_path / "new.txt"), force=False, dry_run=False)
+
+    assert len(full_bucket.history) == 3
+
+
+def test_rm_to_device_bucket(fs, fake_bucket):
+    fs.add_mount_point("/data")
+    fs.create_file("/data/dir/test.txt", contents="test")
+
+    fake_bucket.rm("/data/dir/test.txt", force=False, dry_run=False)
+    entry = list(fake_bucket.history.values())[0]
+
+    assert entry.bucket == f"/data/.myrm-trash-{os.getuid()}"
+    assert os.listdir(entry.bucket) == list(fake_bucket.history)
+    assert not os.listdir(fake_bucket.path) and fake_bucket.get_size() == 4
+    assert bucket.Bucket(path="trash", history_path="history.pkl").buckets == [entry.bucket]
+
+    fake_bucket.check_content()
+    fake_bucket.restore(entry.index, dry_run=False)
+    assert os.path.isfile("/data/dir/test.txt") and not fake_bucket.history
+
+
+def test_rm_to_device_bucket_through_symlink(fs, fake_bucket, mocker):
+    fs.add_mount_point("/data")
+    fs.create_file("/data/dir/test.txt", contents="test")
+    fs.create_symlink("/home/link", "/data/dir")
+    replace_spy = mocker.spy(bucket.os, "replace")
+
+    fake_bucket.rm("/home/link/test.txt", force=False, dry_run=False)
+    entry = list(fake_bucket.history.values())[0]
+
+    assert entry.bucket == f"/data/.myrm-trash-{os.getuid()}"
+    # The list of the buckets is replaced at once.
+    replace_spy.assert_any_call(f"{fake_bucket.registry_path}.tmp", fake_bucket.registry_path)
+    assert not os.path.exists(f"{fake_bucket.registry_path}.tmp")
+
+
+def test_rm_to_device_bucket_with_dry_run(fs, fake_bucket):
+    fs.add_mount_point("/data")
+    fs.create_file("/data/test.txt")
+
+    fake_bucket.rm("/data/test.txt", force=False, dry_run=True)
+    assert os.path.isfile("/data/test.txt") and os.listdir("/data") == ["test.txt"]
+    assert not len(fake_bucket.history) and not fake_bucket._devices
+
+
+def test_rm_to_device_bucket_with_untrusted_bucket(fs, fake_bucket):
+    fs.add_mount_point("/data")
+    fs.create_file("/data/test.txt")
+    fs.create_file(f"/data/.myrm-trash-{os.getuid()}")
+
+    assert fake_bucket._get_bucket_path("/data/test.txt") == fake_bucket.path
+
+
+def test_rm_to_bucket_without_device_buckets(fs, fake_bucket):
+    fs.add_mount_point("/data")
+    fake_bucket.per_device = False
+
+    assert fake_bucket._get_bucket_path("/data/test.txt") == fake_bucket.path
+
+
+def test_check_content_bucket_with_unmounted_device(fs, fake_bucket):
+    fs.add_mount_point("/data")
+    fs.create_file("/data/test.txt")
+    fake_bucket.rm("/data/test.txt", force=False, dry_run=False)
+
+    entry = list(fake_bucket.history.values())[0]
+    fs.remove_object(os.path.join(entry.bucket, list(fake_bucket.history)[0]))
+    os.rmdir(entry.bucket)
+
+    fake_bucket.check_content()
+    assert len(fake_bucket.history) == 1
+
+
+def test_read_bucket_registry_with_error(fake_bucket, mocker):
+    logger_mock = mocker.patch("myrm.bucket.logger")
+    open_mock = mocker.patch("myrm.bucket.io.open")
+    open_mock.side_effect = IOError(errno.EIO, "")
+
+    with pytest.raises(SystemExit) as exit_info:
+        fake_bucket._read_registry()
+
+    logger_mock.error.assert_called_with(
+        "It's impossible to restore the buckets list on the current machine."
+    )
+    assert exit_info.value.code == errno.EIO
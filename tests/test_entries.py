@@ -0,0 +1,135 @@
+import pickle
+import time
+import tracemalloc
+import uuid
+
+from myrm import entries
+
+
+def test_entry_columns(fake_entry):
+    key = "0f8fad5b-d9cb-469f-a165-70867728950e"
+    long_path = "/" + "a" * 60 + "/test.txt"
+    values = {
+        key: fake_entry._replace(origin=long_path, path=entries._get_short_path(long_path)),
+        "test": fake_entry._replace(index=2, trashed_at=None, bucket="/data"),
+        "other": 3,
+    }
+
+    columns = entries.EntryColumns(values)
+    del columns["test"]
+    columns["test"] = values["test"]
+
+    assert columns == values and list(columns) == [key, "other", "test"]
+    assert columns._rows[entries._pack_key(key)] >= 0 and len(entries._pack_key(key)) == 16
+    assert columns._rows[entries._pack_key(key)] not in columns._path
+    assert columns.get_key(2) == "test" and columns.get_key(3) is None
+    assert columns.get_size() == 0
+    assert pickle.loads(pickle.dumps(columns)) == values
+
+
+def test_entry_columns_memory(fake_entry):
+    values = {
+        str(uuid.uuid4()): fake_entry._replace(
+            index=index,
+            name=f"test_{index}.txt",
+            path=f"/home/user/test_{index}.txt",
+            trashed_at=time.time(),
+            origin=f"/home/user/test_{index}.txt",
+            size=index,
+        )
+        for index in range(10000)
+    }
+
+    def measure(factory):
+        tracemalloc.start()
+        # The values are copied, so only the new representation is measured.
+        data = factory(pickle.loads(pickle.dumps(values)))
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del data
+        return size
+
+    assert measure(entries.EntryColumns) < measure(dict) // 2
+
+
+def test_entry_columns_select(fake_entry):
+    columns = entries.EntryColumns(
+        {
+            str(index): fake_entry._replace(
+                index=index,
+                name=name,
+                path=origin,
+                trashed_at=100.0 * index,
+                origin=origin,
+                size=size,
+            )
+            for index, name, origin, size in (
+                (1, "b.txt", "/srv/app/b.txt", 30),
+                (2, "a.log", "/srv/app/a.log", 10),
+                (3, "c.txt", "/home/c.txt", 20),
+                (4, "d.log", "/srv/application/d.log", 40),
+            )
+        }
+    )
+
+    def select(**query):
+        return [entry.index for entry in columns.select(**query)]
+
+    assert select(sort="name") == [2, 1, 3, 4]
+    assert select(sort="size", reverse=True) == [4, 1, 3, 2]
+    assert select(since=200.0, until=400.0) == [2, 3]
+    assert select(origin_prefix="/srv/app", sort="date", reverse=True) == [2, 1]
+    assert select(origin_prefix="/srv/app/b.txt") == [1]
+    assert select(origin_prefix="/srv") == [1, 2, 4]
+    assert select(origin_prefix="/srv", reverse=True) == [4, 2, 1]
+    assert select(name_glob="*.log", sort="size") == [2, 4]
+    assert select(name_glob="c*", until=300.0) == []
+
+    # The indexes are kept up to date after they are built.
+    columns["5"] = fake_entry._replace(index=5, name="e.txt", origin="/srv/app/e.txt", size=50)
+    columns["2"] = columns["2"]._replace(size=60)
+    del columns["1"]
+    assert select(sort="size") == [3, 4, 5, 2]
+    assert select(sort="name", reverse=True) == [5, 4, 3, 2]
+    assert select() == [2, 3, 4, 5]
+
+    # The indexes are saved together with the compacted columns.
+    restored = pickle.loads(pickle.dumps(columns))
+    assert restored._orders is not None
+    assert [entry.index for entry in restored.select(sort="origin")] == [3, 2, 5, 4]
+
+
+def test_entry_columns_select_with_equal_values(fake_entry):
+    columns = entries.EntryColumns(
+        {str(index): fake_entry._replace(index=index, size=4) for index in (3, 1, 2)}
+    )
+    columns._get_orders()
+
+    # The entries with the equal values are ordered by their indices like in the database.
+    columns["0"] = fake_entry._replace(index=0, size=4)
+    del columns["2"]
+    assert [entry.index for entry in columns.select(sort="size")] == [0, 1, 3]
+    assert [entry.index for entry in columns.select(sort="size", reverse=True)] == [3, 1, 0]
+    assert [entry.index for entry in columns.select(sort="size", name_glob="*")] == [0, 1, 3]
+
+
+def test_entry_columns_get_key(fake_entry):
+    columns = entries.EntryColumns(
+        {str(index): fake_entry._replace(index=index) for index in range(1, 6)}
+    )
+    del columns["2"]
+    columns["3"] = columns["3"]._replace(index=7)
+
+    assert [columns.get_key(index) for index in range(1, 8)] == [
+        "1",
+        None,
+        None,
+        "4",
+        "5",
+        None,
+        "3",
+    ]
+
+    # The order of the indices is remapped together with the compacted rows.
+    restored = pickle.loads(pickle.dumps(columns))
+    assert restored.get_key(7) == "3" and restored.get_key(5) == "5"
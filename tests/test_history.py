@@ -0,0 +1,473 @@
+import errno
+import io
+import json
+import os
+import pickle
+import sqlite3
+import time
+
+import pytest
+from prettytable import PrettyTable
+
+from myrm import history
+
+
+def test_delitem_bucket_history(fake_bucket_history):
+    test_history = {"1": 1, "2": 2, "3": 3}
+    fake_bucket_history.update(test_history)
+
+    del fake_bucket_history["1"]
+    del fake_bucket_history["2"]
+    assert list(fake_bucket_history.values()) == [3]
+
+    assert history.BucketHistory(path=fake_bucket_history.path) == {"3": 3}
+
+
+def test_read_bucket_history(fs):
+    path = "test.pkl"
+    test_history = {"1": 1, "2": 2, "3": 3}
+    with io.open(path, mode="wb") as stream_out:
+        pickle.dump(test_history, stream_out, protocol=pickle.HIGHEST_PROTOCOL)
+
+    assert history.BucketHistory(path=path) == test_history
+
+
+def test_read_bucket_history_with_error(fake_bucket_history, mocker):
+    logger_mock = mocker.patch("myrm.history.logger")
+    open_mock = mocker.patch("myrm.history.io.open")
+    open_mock.side_effect = IOError(errno.EIO, "")
+
+    with pytest.raises(SystemExit) as exit_info:
+        fake_bucket_history._read()
+
+    logger_mock.error.assert_called_with(
+        "It's impossible to restore the history state on the current machine."
+    )
+    assert exit_info.value.code == errno.EIO
+
+
+def test_read_bucket_history_with_journal(fake_bucket_history):
+    test_history = {"1": 1, "2": 2, "3": 3}
+    fake_bucket_history.update(test_history)
+    del fake_bucket_history["2"]
+
+    assert os.path.isfile(fake_bucket_history.journal_path)
+    assert history.BucketHistory(path=fake_bucket_history.path) == {"1": 1, "3": 3}
+
+
+def test_read_bucket_history_with_damaged_journal(fake_bucket_history, mocker):
+    logger_mock = mocker.patch("myrm.history.logger")
+    fake_bucket_history.update({"1": 1, "2": 2})
+
+    with io.open(fake_bucket_history.journal_path, mode="ab") as stream_out:
+        stream_out.write(b"\x80\x05\x95")
+
+    assert history.BucketHistory(path=fake_bucket_history.path) == {"1": 1, "2": 2}
+    logger_mock.warning.assert_called_with("The history journal is damaged and will be compacted.")
+    assert not os.path.exists(fake_bucket_history.journal_path)
+
+
+def test_write_bucket_history(fake_bucket_history):
+    test_history = {"1": 1, "2": 2, "3": 3}
+    fake_bucket_history.update(test_history)
+    fake_bucket_history._write()
+
+    with io.open(fake_bucket_history.path, mode="rb") as stream_in:
+        assert pickle.load(stream_in) == test_history
+    assert not os.path.exists(fake_bucket_history.journal_path)
+
+
+def test_append_bucket_history(fake_bucket_history):
+    fake_bucket_history["1"] = 1
+    snapshot_size = os.path.getsize(fake_bucket_history.path)
+
+    fake_bucket_history["2"] = 2
+    del fake_bucket_history["1"]
+
+    assert os.path.getsize(fake_bucket_history.path) == snapshot_size
+    assert os.path.getsize(fake_bucket_history.journal_path) == fake_bucket_history.journal_size
+
+
+def test_append_bucket_history_with_compaction(fs):
+    test_history = history.BucketHistory(path="history.pkl", journal_maxsize=1)
+    test_history.update({"1": 1, "2": 2})
+
+    with io.open(test_history.path, mode="rb") as stream_in:
+        assert pickle.load(stream_in) == {"1": 1, "2": 2}
+    assert not os.path.exists(test_history.journal_path) and not test_history.journal_size
+
+
+def test_write_bucket_history_with_error(fake_bucket_history, mocker):
+    logger_mock = mocker.patch("myrm.history.logger")
+    open_mock = mocker.patch("myrm.history.io.open")
+    open_mock.side_effect = IOError(errno.EIO, "")
+
+    with pytest.raises(SystemExit) as exit_info:
+        fake_bucket_history._write()
+
+    logger_mock.error.assert_called_with(
+        "It's impossible to save the history state on the current machine."
+    )
+    assert exit_info.value.code == errno.EIO
+
+
+def test_get_indices_bucket_history(fake_bucket_history, fake_entry):
+    fake_bucket_history["test"] = fake_entry
+    assert fake_bucket_history.get_indices() == [1]
+
+
+def test_get_next_index_bucket_history(fake_bucket_history, fake_entry):
+    fake_bucket_history["test"] = fake_entry
+    assert fake_bucket_history.get_next_index() == 2
+
+
+def test_get_next_index_bucket_history_after_delete(fake_bucket_history, fake_entry):
+    fake_bucket_history["first"] = fake_entry
+    fake_bucket_history["second"] = fake_entry._replace(index=2)
+    del fake_bucket_history["second"]
+    assert fake_bucket_history.get_next_index() == 3
+
+    fake_bucket_history._write()
+    assert history.BucketHistory(path=fake_bucket_history.path).get_next_index() == 3
+
+
+def test_get_next_index_bucket_history_with_legacy_snapshot(fs, fake_entry):
+    path = "history.pkl"
+    with io.open(path, mode="wb") as stream_out:
+        pickle.dump({"test": fake_entry._replace(index=7)}, stream_out)
+
+    assert history.BucketHistory(path=path).get_next_index() == 8
+
+
+def test_get_key_bucket_history(fake_bucket_history, fake_entry):
+    fake_bucket_history["first"] = fake_entry
+    fake_bucket_history["second"] = fake_entry._replace(index=2)
+    fake_bucket_history["first"] = fake_entry._replace(index=3)
+
+    assert fake_bucket_history.get_key(1) is None
+    assert fake_bucket_history.get_key(2) == "second"
+    assert fake_bucket_history.get_key(3) == "first"
+
+    del fake_bucket_history["second"]
+    assert fake_bucket_history.get_key(2) is None
+    assert history.BucketHistory(path=fake_bucket_history.path).get_key(3) == "first"
+
+
+def test_bucket_history_cleanup(fake_bucket_history, fake_entry):
+    fake_bucket_history["test"] = fake_entry
+    fake_bucket_history.cleanup(dry_run=False)
+
+    with io.open(fake_bucket_history.path, mode="rb") as stream_in:
+        assert pickle.load(stream_in) == {}
+    assert not len(fake_bucket_history)
+
+
+def test_bucket_history_cleanup_with_dry_run(fake_bucket_history, fake_entry):
+    fake_bucket_history["test"] = fake_entry
+    fake_bucket_history.cleanup(dry_run=True)
+
+    with io.open(fake_bucket_history.path, mode="rb") as stream_in:
+        assert pickle.load(stream_in) == fake_bucket_history
+    assert fake_bucket_history["test"] == fake_entry
+
+
+def test_get_table_bucket_history(fake_bucket_history, fake_entry):
+    fake_bucket_history["test"] = fake_entry
+    table = fake_bucket_history.get_table()
+
+    assert table is not None and isinstance(table, PrettyTable)
+
+
+def test_get_table_bucket_history_with_warning(fake_bucket_history, mocker):
+    logger_mock = mocker.patch("myrm.history.logger")
+
+    with pytest.raises(SystemExit) as exit_info:
+        fake_bucket_history.get_table(1, 1)
+
+    logger_mock.warning.assert_called_with(
+        "Show content of the bucket failed because the main bucket is empty."
+    )
+    assert exit_info.value.code == errno.EPERM
+
+
+def test_get_table_bucket_history_with_index_error(fake_bucket_history, fake_entry, mocker):
+    fake_bucket_history["test"] = fake_entry
+
+    logger_mock = mocker.patch("myrm.history.logger")
+
+    with pytest.raises(SystemExit) as exit_info:
+        fake_bucket_history.get_table(13, 2)
+
+    logger_mock.error.assert_called_with("It's impossible to get the required page number.")
+    assert exit_info.value.code == errno.EPERM
+
+
+def test_iter_page_bucket_history(fake_bucket_history, fake_entry):
+    for index in range(1, 6):
+        fake_bucket_history[str(index)] = fake_entry._replace(index=index)
+
+    assert [entry.index for entry in fake_bucket_history.iter_page(2, 2)] == [3, 4]
+    assert [entry.index for entry in fake_bucket_history.iter_page(1, 0)] == [1, 2, 3, 4, 5]
+    assert not list(fake_bucket_history.iter_page(0, 2))
+
+
+def test_iter_page_bucket_history_with_query(fake_bucket_history, fake_entry):
+    for index in range(1, 6):
+        fake_bucket_history[str(index)] = fake_entry._replace(index=index, size=index % 3)
+
+    pages = [
+        [entry.index for entry in fake_bucket_history.iter_page(page, 2, sort="size")]
+        for page in (1, 2, 3)
+    ]
+    assert pages == [[3, 1], [4, 2], [5]]
+    assert not list(fake_bucket_history.iter_page(1, 0, until=fake_entry.trashed_at))
+
+
+def test_dump_bucket_history(fake_bucket_history, fake_entry):
+    for index in range(1, 4):
+        fake_bucket_history[str(index)] = fake_entry._replace(index=index)
+
+    stream = io.StringIO()
+    fake_bucket_history.dump(stream, "ndjson", page=1, count=2)
+    rows = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [row["index"] for row in rows] == [1, 2]
+    assert rows[0]["trashed_at"] == fake_entry.trashed_at
+
+    stream = io.StringIO()
+    fake_bucket_history.dump(stream, "json", page=1, count=0)
+    assert [row["index"] for row in json.loads(stream.getvalue())] == [1, 2, 3]
+
+    stream = io.StringIO()
+    fake_bucket_history.dump(stream, "tsv", page=2, count=2)
+    assert stream.getvalue().splitlines() == [
+        "\t".join(history.OUTPUT_FIELDS),
+        f"Correct\t3\ttest.txt\ttest.txt\ttest.txt\t{fake_entry.trashed_at}\t0",
+    ]
+
+    stream = io.StringIO()
+    fake_bucket_history.dump(stream, "table")
+    assert "Original location" in stream.getvalue()
+
+
+def test_dump_bucket_history_with_index_error(fake_bucket_history, fake_entry, mocker):
+    fake_bucket_history["test"] = fake_entry
+
+    logger_mock = mocker.patch("myrm.history.logger")
+
+    with pytest.raises(SystemExit) as exit_info:
+        fake_bucket_history.dump(io.StringIO(), "ndjson", page=2, count=1)
+
+    logger_mock.error.assert_called_with("It's impossible to get the required page number.")
+    assert exit_info.value.code == errno.EPERM
+
+
+@pytest.mark.parametrize(
+    "fmt, expected",
+    [("json", "[]\n"), ("ndjson", ""), ("tsv", "\t".join(history.OUTPUT_FIELDS) + "\n")],
+)
+def test_dump_bucket_history_without_matches(fake_bucket_history, fake_entry, fmt, expected):
+    fake_bucket_history["test"] = fake_entry
+
+    stream = io.StringIO()
+    fake_bucket_history.dump(stream, fmt, page=1, count=10, name_glob="*.nomatch")
+    assert stream.getvalue() == expected
+
+
+def test_batch_bucket_history(fake_bucket_history, mocker):
+    fake_bucket_history["0"] = 0
+    append_mock = mocker.spy(fake_bucket_history, "_append")
+
+    with fake_bucket_history.batch():
+        fake_bucket_history["1"] = 1
+        fake_bucket_history["2"] = 2
+        del fake_bucket_history["0"]
+
+    assert append_mock.call_count == 1
+    assert history.BucketHistory(path=fake_bucket_history.path) == {"1": 1, "2": 2}
+
+
+def test_batch_sqlite_bucket_history(fake_sqlite_history, fake_entry):
+    with fake_sqlite_history.batch():
+        fake_sqlite_history["1"] = fake_entry
+        fake_sqlite_history["2"] = fake_entry._replace(index=2)
+        assert fake_sqlite_history.connection.in_transaction
+
+    assert not fake_sqlite_history.connection.in_transaction
+    assert len(history.SQLiteBucketHistory(path=fake_sqlite_history.path)) == 2
+
+
+def test_get_size_bucket_history(fake_bucket_history, fake_entry):
+    fake_bucket_history["first"] = fake_entry._replace(size=4)
+    fake_bucket_history["second"] = fake_entry._replace(size=8)
+    fake_bucket_history["second"] = fake_entry._replace(size=6)
+    assert fake_bucket_history.get_size() == 10
+
+    del fake_bucket_history["first"]
+    assert fake_bucket_history.get_size() == 6
+    assert history.BucketHistory(path=fake_bucket_history.path).get_size() == 6
+
+
+def test_get_size_sqlite_bucket_history(fake_sqlite_history, fake_entry):
+    fake_sqlite_history["first"] = fake_entry._replace(size=4)
+    fake_sqlite_history["second"] = fake_entry._replace(size=8)
+    fake_sqlite_history["second"] = fake_entry._replace(size=6)
+    assert fake_sqlite_history.get_size() == 10
+
+    del fake_sqlite_history["first"]
+    assert fake_sqlite_history.get_size() == 6
+
+
+def test_read_bucket_history_with_legacy_dates(fake_entry, fs):
+    with io.open("history.pkl", mode="wb") as stream_out:
+        pickle.dump({"test": fake_entry._replace(trashed_at="00:00:00 01-01-2000")}, stream_out)
+
+    test_history = history.BucketHistory(path="history.pkl")
+    trashed_at = time.mktime((2000, 1, 1, 0, 0, 0, 0, 0, -1))
+
+    assert test_history["test"].trashed_at == trashed_at
+    assert test_history.get_oldest() == trashed_at
+    with io.open("history.pkl", mode="rb") as stream_in:
+        assert pickle.load(stream_in)["test"].trashed_at == trashed_at
+
+
+def test_get_expired_bucket_history(fake_bucket_history, fake_entry):
+    for index, day in enumerate((3, 1, None)):
+        trashed_at = time.mktime((2000, 1, day, 0, 0, 0, 0, 0, -1)) if day else None
+        fake_bucket_history[str(index)] = fake_entry._replace(index=index, trashed_at=trashed_at)
+    del fake_bucket_history["1"]
+
+    trashed_before = time.mktime((2000, 1, 2, 0, 0, 0, 0, 0, -1))
+    assert fake_bucket_history.get_expired(trashed_before) == []
+    assert fake_bucket_history.get_expired(trashed_before + 60 * 60 * 24 * 2) == ["0"]
+    assert fake_bucket_history.get_oldest() == time.mktime((2000, 1, 3, 0, 0, 0, 0, 0, -1))
+
+    fake_bucket_history._write()
+    test_history = history.BucketHistory(path=fake_bucket_history.path)
+    assert test_history.get_expired(trashed_before + 60 * 60 * 24 * 2) == ["0"]
+
+
+def test_get_expired_sqlite_bucket_history(fake_sqlite_history, fake_entry):
+    fake_sqlite_history["0"] = fake_entry._replace(
+        trashed_at=time.mktime((2000, 1, 1, 0, 0, 0, 0, 0, -1))
+    )
+    fake_sqlite_history["1"] = fake_entry._replace(
+        index=2, trashed_at=time.mktime((2000, 1, 3, 0, 0, 0, 0, 0, -1))
+    )
+
+    assert fake_sqlite_history.get_expired(time.mktime((2000, 1, 2, 0, 0, 0, 0, 0, -1))) == ["0"]
+    assert fake_sqlite_history.get_oldest() == time.mktime((2000, 1, 1, 0, 0, 0, 0, 0, -1))
+
+
+def test_sqlite_bucket_history(fake_sqlite_history, fake_entry):
+    fake_sqlite_history["test"] = fake_entry
+
+    assert fake_sqlite_history["test"] == fake_entry
+    assert "test" in fake_sqlite_history and list(fake_sqlite_history) == ["test"]
+    assert history.SQLiteBucketHistory(path=fake_sqlite_history.path) == {"test": fake_entry}
+
+    del fake_sqlite_history["test"]
+    assert not len(fake_sqlite_history)
+
+    with pytest.raises(KeyError):
+        del fake_sqlite_history["test"]
+
+
+def test_sqlite_bucket_history_indices(fake_sqlite_history, fake_entry):
+    fake_sqlite_history["first"] = fake_entry
+    fake_sqlite_history["second"] = fake_entry._replace(index=3)
+
+    assert fake_sqlite_history.get_indices() == [1, 3]
+    assert fake_sqlite_history.get_next_index() == 4
+    assert fake_sqlite_history.get_key(3) == "second"
+    assert fake_sqlite_history.get_key(2) is None
+
+    del fake_sqlite_history["second"]
+    assert fake_sqlite_history.get_next_index() == 4
+
+    fake_sqlite_history.cleanup(dry_run=False)
+    assert fake_sqlite_history.get_next_index() == 1
+
+
+def test_sqlite_bucket_history_page(fake_sqlite_history, fake_entry):
+    for index in range(1, 6):
+        fake_sqlite_history[str(index)] = fake_entry._replace(index=index)
+
+    assert [entry.index for entry in fake_sqlite_history.get_page(2, 2)] == [3, 4]
+    assert not fake_sqlite_history.get_page(4, 2)
+    assert len(list(fake_sqlite_history.iter_page(1, 0))) == 5
+    assert isinstance(fake_sqlite_history.get_table(3, 2), PrettyTable)
+
+    stream = io.StringIO()
+    fake_sqlite_history.dump(stream, "ndjson", page=3, count=2)
+    assert [json.loads(line)["index"] for line in stream.getvalue().splitlines()] == [5]
+
+
+def test_sqlite_bucket_history_page_with_query(fake_sqlite_history, fake_entry):
+    for index, name in enumerate(("b.txt", "a.log", "c.txt", "d.log"), start=1):
+        fake_sqlite_history[str(index)] = fake_entry._replace(
+            index=index,
+            name=name,
+            trashed_at=100.0 * index,
+            origin=f"/srv/{'app' if index % 2 else 'application'}/{name}",
+            size=index,
+        )
+
+    def select(**query):
+        return [entry.index for entry in fake_sqlite_history.iter_page(1, 0, **query)]
+
+    assert select(sort="name") == [2, 1, 3, 4]
+    assert select(sort="size", reverse=True) == [4, 3, 2, 1]
+    assert select(since=200.0, until=400.0) == [2, 3]
+    assert select(origin_prefix="/srv/app", sort="date", reverse=True) == [3, 1]
+    assert select(origin_prefix="/srv/app/c.txt") == [3]
+    assert select(origin_prefix="/srv", reverse=True) == [4, 3, 2, 1]
+    assert select(name_glob="*.log") == [2, 4]
+
+
+def test_sqlite_bucket_history_cleanup(fake_sqlite_history, fake_entry):
+    fake_sqlite_history["test"] = fake_entry
+
+    fake_sqlite_history.cleanup(dry_run=True)
+    assert len(fake_sqlite_history) == 1
+
+    fake_sqlite_history.cleanup(dry_run=False)
+    assert not len(fake_sqlite_history)
+
+
+def test_sqlite_bucket_history_migration(tmp_path, fake_entry):
+    path = str(tmp_path / "history.pkl")
+    legacy = history.BucketHistory(path=path)
+    legacy["first"] = fake_entry
+    legacy["second"] = fake_entry._replace(index=2)
+
+    test_history = history.SQLiteBucketHistory(path=path)
+    assert test_history == {"first": fake_entry, "second": fake_entry._replace(index=2)}
+    assert not os.path.exists(path) and os.path.isfile(f"{path}.migrated")
+    assert not test_history.upgraded
+    test_history.connection.close()
+
+
+def test_sqlite_bucket_history_migration_with_legacy_snapshot(tmp_path, fake_entry):
+    path = str(tmp_path / "history.pkl")
+    with io.open(path, mode="wb") as stream_out:
+        pickle.dump({"test": fake_entry._replace(trashed_at="00:00:00 01-01-2000")}, stream_out)
+
+    test_history = history.SQLiteBucketHistory(path=path)
+
+    assert test_history["test"].trashed_at == time.mktime((2000, 1, 1, 0, 0, 0, 0, 0, -1))
+    assert test_history.upgraded
+    test_history.connection.close()
+
+
+def test_sqlite_bucket_history_with_error(tmp_path, mocker):
+    logger_mock = mocker.patch("myrm.history.logger")
+    connect_mock = mocker.patch("sqlite3.connect")
+    connect_mock.side_effect = sqlite3.OperationalError()
+
+    with pytest.raises(SystemExit) as exit_info:
+        history.SQLiteBucketHistory(path=str(tmp_path / "history.pkl"))
+
+    logger_mock.error.assert_called_with(
+        "It's impossible to restore the history state on the current machine."
+    )
+    assert exit_info.value.code == errno.EIO
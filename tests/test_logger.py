@@ -0,0 +1,77 @@
+import logging
+import os
+
+from myrm import logger
+
+
+def test_deferred_file_handler(tmp_path):
+    path = str(tmp_path / "myrm.log")
+    handler = logger.DeferredFileHandler(lambda: path, mode="at", encoding="utf-8")
+    handler.setFormatter(logging.Formatter(logger.LOGGING_FORMAT))
+
+    assert handler.handler is None and not os.path.exists(path)
+
+    handler.handle(logging.makeLogRecord({"name": "myrm", "levelname": "ERROR", "msg": "test"}))
+    handler.close()
+
+    with open(path, encoding="utf-8") as stream_in:
+        assert stream_in.read().endswith("ERROR :: myrm :: test\n")
+
+
+def test_setup():
+    logger.setup()
+    logger.setup()
+
+    handlers = logging.getLogger("myrm").handlers
+    assert [type(handler) for handler in handlers] == [
+        logging.StreamHandler,
+        logger.DeferredFileHandler,
+    ]
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_aggregating_handler():
+    target = ListHandler()
+    handler = logger.AggregatingHandler([target], every=2)
+
+    for size in (1, 2, 3):
+        handler.handle(
+            logging.makeLogRecord(
+                {"levelno": logging.INFO, "msg": "item", "operation": "rm", "size": size}
+            )
+        )
+    handler.handle(logging.makeLogRecord({"levelno": logging.INFO, "msg": "other"}))
+    handler.close()
+
+    assert target.messages == [
+        "2 items (3 bytes) were processed by the 'rm' operation.",
+        "other",
+        "1 items (3 bytes) were processed by the 'rm' operation.",
+    ]
+
+
+def test_setup_queue():
+    myrm_logger = logging.getLogger("myrm")
+    handlers = list(myrm_logger.handlers)
+    target = ListHandler()
+    myrm_logger.handlers[:] = [target]
+
+    try:
+        logger.setup_queue()
+        assert myrm_logger.handlers != [target]
+
+        myrm_logger.warning("test %s", "message")
+        logger.shutdown_queue()
+
+        assert myrm_logger.handlers == [target]
+        assert target.messages == ["test message"]
+    finally:
+        myrm_logger.handlers[:] = handlers
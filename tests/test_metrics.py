@@ -0,0 +1,138 @@
+import concurrent.futures
+import json
+import os
+import time
+
+import pytest
+
+from myrm import bucket, metrics
+
+
+def test_metrics_without_record(fs):
+    @metrics.timed("test")
+    def function():
+        return 1
+
+    metrics.count("trash", 10)
+    metrics.observe("test", 0.5)
+    metrics.gauge("test", lambda: 1)
+
+    assert function() == 1
+    assert metrics.stop() is None
+
+
+def test_record_prometheus(fs):
+    path = "metrics.prom"
+
+    for _ in range(2):
+        with metrics.record(path) as test_metrics:
+            assert metrics.start(path) is test_metrics
+            metrics.count("trash", 10)
+            metrics.observe("rm", 0.02)
+            metrics.gauge("myrm_bucket_size_bytes", lambda: 10)
+
+    with open(path, encoding="utf-8") as stream_in:
+        lines = stream_in.read().splitlines()
+
+    assert "# TYPE myrm_items_total counter" in lines
+    assert 'myrm_items_total{operation="trash"} 2' in lines
+    assert 'myrm_bytes_total{operation="trash"} 20' in lines
+    assert 'myrm_duration_seconds_bucket{method="rm",le="0.01"} 0' not in lines
+    assert 'myrm_duration_seconds_bucket{method="rm",le="0.05"} 2' in lines
+    assert 'myrm_duration_seconds_bucket{method="rm",le="+Inf"} 2' in lines
+    assert 'myrm_duration_seconds_count{method="rm"} 2' in lines
+    assert 'myrm_duration_seconds_sum{method="rm"} 0.04' in lines
+    assert "myrm_bucket_size_bytes 10" in lines
+
+
+def test_record_json(fs):
+    path = "metrics.json"
+
+    for size in (10, 20):
+        with metrics.record(path, "json"):
+            metrics.count("restore", size)
+
+    with open(path, encoding="utf-8") as stream_in:
+        values = json.load(stream_in)
+
+    assert {"name": "myrm_bytes_total", "labels": {"operation": "restore"}, "value": 30} in values
+
+
+def _count_trash(path, times):
+    for _ in range(times):
+        with metrics.record(path):
+            metrics.count("trash")
+
+
+def test_record_concurrently(tmp_path):
+    path = str(tmp_path / "metrics.prom")
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=8) as executor:
+        list(executor.map(_count_trash, [path] * 8, [20] * 8))
+
+    with open(path, encoding="utf-8") as stream_in:
+        assert 'myrm_items_total{operation="trash"} 160' in stream_in.read().splitlines()
+    assert sorted(os.listdir(str(tmp_path))) == ["metrics.prom", "metrics.prom.lock"]
+
+
+def test_record_with_damaged_file(fs):
+    path = "metrics.json"
+    fs.create_file(path, contents="damaged")
+
+    with metrics.record(path, "json"):
+        metrics.count("delete")
+
+    with open(path, encoding="utf-8") as stream_in:
+        assert len(json.load(stream_in)) == 2
+
+
+def test_record_with_io_error(fs, mocker):
+    logger_mock = mocker.patch("myrm.metrics.logger")
+    mocker.patch("myrm.metrics.io.open", side_effect=OSError)
+
+    with metrics.record("metrics.prom"):
+        metrics.count("trash")
+
+    logger_mock.warning.assert_called_once()
+
+
+def test_start_with_unknown_format():
+    with pytest.raises(ValueError):
+        metrics.start("metrics.prom", "none")
+
+
+def test_bucket_metrics(fs):
+    fs.create_file("test.txt", contents="test")
+    fs.create_file("forced.txt", contents="forced")
+
+    with metrics.record("metrics.prom") as test_metrics:
+        test_bucket = bucket.Bucket(path="trash", history_path="history.pkl", maxsize=100)
+        test_bucket.startup()
+        test_bucket.rm("test.txt")
+        test_bucket.rm("forced.txt", force=True)
+        test_bucket.restore(1)
+        test_bucket.rm("test.txt")
+
+        samples = test_metrics.get_samples()
+
+    for operation, items, size in (("trash", 2, 8), ("restore", 1, 4), ("delete", 1, 6)):
+        assert samples["myrm_items_total", (("operation", operation),)] == items
+        assert samples["myrm_bytes_total", (("operation", operation),)] == size
+    for method, calls in (("startup", 1), ("rm", 3), ("restore", 1)):
+        assert samples["myrm_duration_seconds_count", (("method", method),)] == calls
+    assert samples["myrm_bucket_size_bytes", ()] == 4
+    assert samples["myrm_bucket_maxsize_bytes", ()] == 100
+
+
+def test_bucket_metrics_with_expired_items(fs, mocker):
+    test_bucket = bucket.Bucket(path="trash", history_path="history.pkl")
+    test_bucket.create()
+    fs.create_file(os.path.join(test_bucket.path, "test.txt"), contents="test")
+    mocker.patch("myrm.bucket.time.time", return_value=time.time() + test_bucket.storetime + 60)
+
+    with metrics.record("metrics.prom") as test_metrics:
+        test_bucket.startup()
+        samples = test_metrics.get_samples()
+
+    assert samples["myrm_items_total", (("operation", "expire"),)] == 1
+    assert samples["myrm_bytes_total", (("operation", "expire"),)] == 4
@@ -0,0 +1,57 @@
+import os
+import pstats
+
+from myrm import bucket, profiler
+
+
+def test_phase_without_profiler():
+    calls = []
+
+    @profiler.timed("test")
+    def function(value):
+        calls.append(value)
+        return value
+
+    with profiler.phase("test"):
+        assert function(1) == 1
+
+    assert calls == [1]
+    assert profiler.stop() is None
+
+
+def test_profile(tmp_path):
+    stat, supports_dir_fd = os.stat, set(os.supports_dir_fd)
+
+    with profiler.profile() as test_profiler:
+        assert profiler.start() is test_profiler
+        assert (os.stat in os.supports_dir_fd) == (stat in supports_dir_fd)
+
+        with profiler.phase("outer"):
+            with profiler.phase("inner"), profiler.phase("inner"):
+                os.stat(str(tmp_path))
+            os.listdir(str(tmp_path))
+
+    assert os.stat is stat and set(os.supports_dir_fd) == supports_dir_fd
+    assert sorted(test_profiler.phases) == ["outer", "outer/inner"]
+    assert test_profiler.phases["outer/inner"][0] == 1
+    assert test_profiler.syscalls["stat"] == 1 and test_profiler.syscalls["listdir"] == 1
+
+    report = test_profiler.format()
+    assert "outer/inner" in report and "listdir" in report
+
+
+def test_profile_bucket(tmp_path):
+    path = tmp_path / "test.txt"
+    path.write_text("test")
+    dump_path = str(tmp_path / "myrm.pstats")
+
+    test_bucket = bucket.Bucket(
+        path=str(tmp_path / "trash"), history_path=str(tmp_path / "history.pkl")
+    )
+    with profiler.profile(dump_path) as test_profiler:
+        test_bucket.startup()
+        test_bucket.rm(str(path))
+
+    assert {"size", "move", "history.save", "reconcile"} <= set(test_profiler.phases)
+    assert test_profiler.syscalls["rename"] == 1
+    assert pstats.Stats(dump_path).total_calls > 0
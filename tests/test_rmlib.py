@@ -4,7 +4,37 @@ import os
 
 import pytest
 
-from myrm.rmlib import mkdir, mv, mvdir, rm, rmdir
+from myrm.rmlib import DEFAULT_WORKERS, Strategy, getsize, mkdir, mv, mvdir, rm, rmdir
+
+
+def test_getsize(fs):
+    fs.create_file("dir/test.txt", contents="test")
+    fs.create_file("dir/inner_dir/inner_test.txt", contents="inner")
+    fs.create_symlink("dir/link", "dir/test.txt")
+
+    assert getsize("dir") == 9
+    assert getsize("dir/test.txt") == 4
+    assert getsize("dir/link") == 0
+
+
+def test_getsize_with_hardlinks(fs):
+    fs.create_file("dir/test.txt", contents="test")
+    os.link("dir/test.txt", "dir/test_link.txt")
+
+    assert getsize("dir") == 4
+
+
+def test_getsize_with_limit(fs):
+    for index in range(10):
+        fs.create_file(f"dir/{index}/test.txt", contents="test")
+
+    assert getsize("dir", limit=4, workers=1) >= 4
+    assert getsize("dir", limit=0) == 0
+
+
+def test_getsize_with_error(fs):
+    with pytest.raises(OSError):
+        getsize("dir")
 
 
 def test_mkdir(mocker, caplog, fs):  # pylint: disable=unused-argument
@@ -14,7 +44,9 @@ def test_mkdir(mocker, caplog, fs):  # pylint: disable=unused-argument
     with caplog.at_level(logging.INFO, logger="myrm"):
         mkdir(path, dry_run=False)
 
-    logger_mock.info.assert_called_with("Directory '%s' was created.", path)
+    logger_mock.info.assert_called_with(
+        "Directory '%s' was created.", path, extra={"operation": "mkdir"}
+    )
     assert os.path.exists(path) and os.path.isdir(path)
 
 
@@ -25,7 +57,9 @@ def test_mkdir_with_dry_run(mocker, caplog, fs):  # pylint: disable=unused-argum
     with caplog.at_level(logging.INFO, logger="myrm"):
         mkdir(path, dry_run=True)
 
-    logger_mock.info.assert_called_with("Directory '%s' was created.", path)
+    logger_mock.info.assert_called_with(
+        "Directory '%s' was created.", path, extra={"operation": "mkdir"}
+    )
     assert not os.path.exists(path)
 
 
@@ -39,12 +73,16 @@ def test_mkdir_with_error_exists(fake_tree):
 def test_rm(fs, mocker, caplog):
     logger_mock = mocker.patch("myrm.rmlib.logger")
     path = "test.txt"
-    fs.create_file(path)
+    fs.create_file(path, contents="test")
 
     with caplog.at_level(logging.INFO, logger="myrm"):
         rm(path, dry_run=False)
 
-    logger_mock.info.assert_called_with("Item '%s' was deleted from the current machine.", path)
+    logger_mock.info.assert_called_with(
+        "Item '%s' was deleted from the current machine.",
+        path,
+        extra={"operation": "rm", "size": 4},
+    )
     assert not os.path.exists(path)
 
 
@@ -56,7 +94,11 @@ def test_rm_with_dry_run(fs, mocker, caplog):
     with caplog.at_level(logging.INFO, logger="myrm"):
         rm(path, dry_run=True)
 
-    logger_mock.info.assert_called_with("Item '%s' was deleted from the current machine.", path)
+    logger_mock.info.assert_called_with(
+        "Item '%s' was deleted from the current machine.",
+        path,
+        extra={"operation": "rm", "size": 0},
+    )
     assert os.path.exists(path) and os.path.isfile(path)
 
 
@@ -86,6 +128,36 @@ def test_rmdir_with_dry_run(fake_tree, mocker, caplog):
     assert os.path.exists(path) and os.path.isdir(path)
 
 
+def test_rmdir_with_summary(fake_tree, mocker):
+    logger_mock = mocker.patch("myrm.rmlib.logger")
+    path = fake_tree[0]
+
+    rmdir(path, dry_run=False, workers=1)
+
+    logger_mock.info.assert_any_call(
+        "%s files and %s directories were deleted from '%s'.", 2, 1, path
+    )
+    assert not os.path.exists(path)
+
+
+def test_rmdir_with_dir_fd(tmp_path):
+    path = tmp_path / "dir"
+    for index in range(10):
+        inner_dir = path.joinpath(*(str(number) for number in range(index + 1)))
+        inner_dir.mkdir(parents=True)
+        (inner_dir / "test.txt").write_bytes(b"0")
+
+    target = tmp_path / "target"
+    target.mkdir()
+    (target / "test.txt").write_bytes(b"0")
+    (path / "link").symlink_to(target, target_is_directory=True)
+
+    rmdir(str(path), dry_run=False)
+
+    assert not path.exists()
+    assert (target / "test.txt").exists()
+
+
 def test_mv(fs, mocker, caplog):
     logger_mock = mocker.patch("myrm.rmlib.logger")
 
@@ -97,7 +169,10 @@ def test_mv(fs, mocker, caplog):
         mv(src, dst, dry_run=False)
 
     logger_mock.info.assert_called_with(
-        "Item '%s' was moved to '%s' as a destinational path.", src, dst
+        "Item '%s' was moved to '%s' as a destinational path.",
+        src,
+        dst,
+        extra={"operation": "mv", "size": 0},
     )
     assert not os.path.exists(src) and os.path.exists(dst)
 
@@ -113,7 +188,10 @@ def test_mv_with_dry_run(fs, mocker, caplog):
         mv(src, dst, dry_run=True)
 
     logger_mock.info.assert_called_with(
-        "Item '%s' was moved to '%s' as a destinational path.", src, dst
+        "Item '%s' was moved to '%s' as a destinational path.",
+        src,
+        dst,
+        extra={"operation": "mv", "size": 0},
     )
     assert os.path.exists(src) and not os.path.exists(dst)
 
@@ -132,7 +210,30 @@ def test_mvdir(fake_tree, mocker, caplog):
     assert not os.path.exists(src) and os.path.exists(dst)
 
     for path in fake_tree:
-        assert os.path.exists(path.replace(src, dst))
+        assert os.path.exists(os.path.join(dst, os.path.relpath(path, src)))
+
+
+def test_mvdir_strategy(fake_tree, fs):
+    assert mvdir(fake_tree[0], "new_dir", dry_run=True) == Strategy.RENAME
+    assert mvdir(fake_tree[0], "new_dir", dry_run=False) == Strategy.RENAME
+
+
+def test_mvdir_strategy_with_existing_destination(fake_tree, fs):
+    fs.create_file("new_dir/test.cfg")
+
+    assert mvdir(fake_tree[0], "new_dir", dry_run=True) == Strategy.WALK
+    assert mvdir(fake_tree[0], "new_dir", dry_run=False) == Strategy.WALK
+    assert not os.path.exists(fake_tree[0])
+    assert os.path.isfile("new_dir/test.cfg") and os.path.isfile("new_dir/inner_dir/inner_test.txt")
+
+
+def test_mvdir_strategy_with_cross_device_error(fake_tree, mocker):
+    rename_mock = mocker.patch("myrm.rmlib.os.rename", side_effect=[OSError(errno.EXDEV, "")])
+    walk_mock = mocker.patch("myrm.rmlib._mvtree")
+
+    assert mvdir(fake_tree[0], "new_dir", dry_run=False) == Strategy.WALK
+    rename_mock.assert_called_once_with(fake_tree[0], "new_dir")
+    walk_mock.assert_called_once_with(fake_tree[0], "new_dir", False, DEFAULT_WORKERS)
 
 
 def test_mvdir_with_dry_run(fake_tree, mocker, caplog):
@@ -178,8 +279,8 @@ def test_rm_with_error(mocker):
 
 def test_rmdir_walk_with_error(mocker):
     logger_mock = mocker.patch("myrm.rmlib.logger")
-    walk_mock = mocker.patch("myrm.rmlib.os.walk")
-    walk_mock.side_effect = OSError(errno.EPERM, "")
+    scandir_mock = mocker.patch("myrm.rmlib.os.scandir")
+    scandir_mock.side_effect = OSError(errno.EPERM, "")
 
     with pytest.raises(SystemExit) as exit_info:
         rmdir("", dry_run=False)
@@ -188,6 +289,18 @@ def test_rmdir_walk_with_error(mocker):
     assert exit_info.value.code == errno.EPERM
 
 
+def test_rmdir_unlink_with_error(fake_tree, mocker):
+    logger_mock = mocker.patch("myrm.rmlib.logger")
+    unlink_mock = mocker.patch("myrm.rmlib.os.unlink")
+    unlink_mock.side_effect = OSError(errno.EPERM, "")
+
+    with pytest.raises(SystemExit) as exit_info:
+        rmdir(fake_tree[0], dry_run=False)
+
+    logger_mock.error.assert_called_with("Item's path can not be deleted from the current machine.")
+    assert exit_info.value.code == errno.EPERM
+
+
 def test_rmdir_inner_with_error(fake_tree, mocker):
     logger_mock = mocker.patch("myrm.rmlib.logger")
     rmdir_mock = mocker.patch("myrm.rmlib.os.rmdir")
@@ -202,13 +315,16 @@ def test_rmdir_inner_with_error(fake_tree, mocker):
     assert exit_info.value.code == errno.EPERM
 
 
-def test_rmdir_with_error(mocker):
+def test_rmdir_with_error(fs, mocker):
     logger_mock = mocker.patch("myrm.rmlib.logger")
     rmdir_mock = mocker.patch("myrm.rmlib.os.rmdir")
     rmdir_mock.side_effect = OSError(errno.EPERM, "")
 
+    path = "dir"
+    fs.create_dir(path)
+
     with pytest.raises(SystemExit) as exit_info:
-        rmdir("", dry_run=False)
+        rmdir(path, dry_run=False)
 
     logger_mock.error.assert_called_with(
         "The determined path can't be deleted from the current machine."
@@ -232,11 +348,89 @@ def test_mv_with_error(mocker):
 
 def test_mvdir_with_error(mocker):
     logger_mock = mocker.patch("myrm.rmlib.logger")
-    walk_mock = mocker.patch("myrm.rmlib.os.walk")
-    walk_mock.side_effect = OSError(errno.EPERM, "")
+    scandir_mock = mocker.patch("myrm.rmlib.os.scandir")
+    scandir_mock.side_effect = OSError(errno.EPERM, "")
 
     with pytest.raises(SystemExit) as exit_info:
         mvdir("", "", dry_run=False)
 
     logger_mock.error.assert_called_with("The determined path not exists on the current machine.")
     assert exit_info.value.code == errno.EPERM
+
+
+def test_mv_cross_device(tmp_path, mocker):
+    src, dst = tmp_path / "1.txt", tmp_path / "2.txt"
+    src.write_bytes(b"test" * 1024)
+    os.chmod(src, 0o640)
+    mocker.patch("myrm.rmlib.os.rename", side_effect=OSError(errno.EXDEV, ""))
+
+    mv(str(src), str(dst), dry_run=False)
+    assert not src.exists() and dst.read_bytes() == b"test" * 1024
+    assert os.stat(dst).st_mode & 0o777 == 0o640
+
+
+def test_mv_cross_device_symlink(tmp_path, mocker):
+    src, dst = tmp_path / "link", tmp_path / "new_link"
+    os.symlink("target", src)
+    mocker.patch("myrm.rmlib.os.rename", side_effect=OSError(errno.EXDEV, ""))
+
+    mv(str(src), str(dst), dry_run=False)
+    assert not os.path.lexists(src) and os.readlink(dst) == "target"
+
+
+def test_mv_cross_device_without_zero_copy(tmp_path, mocker):
+    src, dst = tmp_path / "1.txt", tmp_path / "2.txt"
+    src.write_bytes(b"test" * 1024)
+    mocker.patch("myrm.rmlib.os.rename", side_effect=OSError(errno.EXDEV, ""))
+    mocker.patch("myrm.rmlib._copy_file_range", side_effect=OSError(errno.ENOSYS, ""))
+    sendfile_mock = mocker.patch("myrm.rmlib._sendfile", side_effect=OSError(errno.EINVAL, ""))
+
+    mv(str(src), str(dst), dry_run=False)
+    assert sendfile_mock.called
+    assert not src.exists() and dst.read_bytes() == b"test" * 1024
+
+
+def test_mv_cross_device_with_incomplete_copy(tmp_path, mocker):
+    src, dst = tmp_path / "1.txt", tmp_path / "2.txt"
+    src.write_bytes(b"test")
+    mocker.patch("myrm.rmlib.os.rename", side_effect=OSError(errno.EXDEV, ""))
+    mocker.patch("myrm.rmlib._copydata")
+    logger_mock = mocker.patch("myrm.rmlib.logger")
+
+    with pytest.raises(SystemExit) as exit_info:
+        mv(str(src), str(dst), dry_run=False)
+
+    logger_mock.error.assert_called_with(
+        "The determined item can't be moved to the destinational path."
+    )
+    assert exit_info.value.code == errno.EIO
+    assert src.read_bytes() == b"test" and not dst.exists()
+
+
+@pytest.mark.parametrize(
+    "target", ["myrm.rmlib._copydata", "myrm.rmlib.shutil.copystat", "myrm.rmlib.os.chown"]
+)
+def test_mv_cross_device_with_copy_error(tmp_path, mocker, target):
+    src, dst = tmp_path / "1.txt", tmp_path / "2.txt"
+    src.write_bytes(b"test")
+    mocker.patch("myrm.rmlib.os.rename", side_effect=OSError(errno.EXDEV, ""))
+    mocker.patch(target, side_effect=OSError(errno.ENOSPC, ""))
+
+    with pytest.raises(SystemExit) as exit_info:
+        mv(str(src), str(dst), dry_run=False)
+
+    assert exit_info.value.code == errno.ENOSPC
+    assert src.read_bytes() == b"test" and not dst.exists()
+
+
+def test_mvdir_cross_device(tmp_path, mocker):
+    src, dst = tmp_path / "dir", tmp_path / "new_dir"
+    mocker.patch("myrm.rmlib.os.rename", side_effect=OSError(errno.EXDEV, ""))
+    (src / "inner_dir").mkdir(parents=True)
+    (src / "test.txt").write_text("test")
+    (src / "inner_dir" / "inner_test.txt").write_text("inner")
+
+    assert mvdir(str(src), str(dst), dry_run=False, workers=2) == Strategy.WALK
+    assert not src.exists()
+    assert (dst / "test.txt").read_text() == "test"
+    assert (dst / "inner_dir" / "inner_test.txt").read_text() == "inner"
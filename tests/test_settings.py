@@ -24,6 +24,19 @@ def test_load_settings(fs):
     assert os.path.basename(settings.load(path).bucket_path) == test_settings["bucket_path"]
 
 
+def test_load_settings_with_metrics(fs):
+    path = "test.json"
+    test_settings = {"metrics_format": "json", "metrics_path": "metrics.json"}
+
+    with io.open(path, mode="wt", encoding="utf-8") as stream_out:
+        json.dump(test_settings, stream_out)
+
+    app_settings = settings.load(path)
+    assert app_settings.dump()["metrics_format"] == "json"
+    assert app_settings.metrics_path == "metrics.json"
+    assert settings.AppSettings().metrics_format == settings.DEFAULT_METRICS_FORMAT
+
+
 def test_load_settings_with_io_error(fs, mocker):
     logger_mock = mocker.patch("myrm.settings.logger")
     open_mock = mocker.patch("myrm.settings.io.open")
@@ -119,6 +132,22 @@ def test_boolean_field_with_type_error(fake_boolean):
     assert str(exit_info.value) == "Flag must be boolean but recieved: {0!r}.".format(type(flag))
 
 
+def test_choice_field(fake_choice):
+    fake_choice.choice = "second"
+    assert fake_choice.choice == "second"
+
+
+def test_choice_field_with_value_error(fake_choice):
+    choice = "third"
+
+    with pytest.raises(settings.ValidationError) as exit_info:
+        fake_choice.choice = choice
+
+    assert str(exit_info.value) == "Choice must be one of {0!r} but recieved: {1!r}.".format(
+        ("first", "second"), choice
+    )
+
+
 def test_app_settings_with_validation_error(caplog):
     test_settings = {
         "bucket_path": "test",
@@ -0,0 +1,58 @@
+import math
+import os
+import subprocess
+import sys
+
+import pytest
+
+import myrm
+
+# The import of the CLI module is compared with the import of the standard modules it
+# requires anyway, so the budget does not depend on the speed of the machine.
+STARTUP_RATIO: float = float(os.environ.get("MYRM_STARTUP_RATIO", 3.0))
+REFERENCE_MODULES = ("argparse", "logging")
+# The modules which are imported only by the commands which require them.
+LAZY_MODULES = ("logging.config", "prettytable", "sqlite3", "tempfile")
+
+# The import time is reported by the interpreter since Python 3.7.
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 7), reason="requires -X importtime")
+
+
+def import_times(module):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(myrm.__file__)))
+    # The subprocess is not measured by the coverage of the tests.
+    env = {name: value for name, value in os.environ.items() if not name.startswith("COV_CORE")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        cwd=root,
+        env={**env, "PYTHONPATH": root},
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split(":", 1)[1].split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def test_startup_imports():
+    times = import_times("myrm.__main__")
+
+    assert not set(LAZY_MODULES) & set(times)
+
+
+def test_startup_budget():
+    # The fastest of several runs is compared, so the busy machine does not fail the test.
+    startup = reference = math.inf
+    for _ in range(5):
+        startup = min(startup, import_times("myrm.__main__")["myrm.__main__"])
+        times = import_times(", ".join(REFERENCE_MODULES))
+        reference = min(reference, sum(times[name] for name in REFERENCE_MODULES))
+
+    assert startup < reference * STARTUP_RATIO
@@ -0,0 +1,122 @@
+import contextlib
+import os
+import re
+import threading
+
+import pytest
+
+from myrm.walklib import isdir, match, scandir, supports_dir_fd, walk
+
+
+def test_isdir(fs):
+    fs.create_dir("dir")
+    fs.create_file("test.txt")
+    fs.create_symlink("link", "dir")
+
+    assert isdir("dir")
+    assert not isdir("test.txt")
+    assert not isdir("link")
+    assert not isdir("not_exists")
+
+
+def test_scandir(fs):
+    fs.create_file("dir/test.txt")
+    fs.create_dir("dir/inner_dir")
+    fs.create_symlink("dir/link", "dir/inner_dir")
+
+    with scandir("dir") as (fd, dirs, nondirs):
+        assert fd is None
+        assert [entry.name for entry in dirs] == ["inner_dir"]
+        assert sorted(entry.name for entry in nondirs) == ["link", "test.txt"]
+
+
+@pytest.mark.skipif(not supports_dir_fd(), reason="requires the relative system calls")
+def test_scandir_with_dir_fd(tmp_path):
+    (tmp_path / "inner_dir").mkdir()
+    (tmp_path / "test.txt").write_bytes(b"test")
+
+    with scandir(str(tmp_path)) as (fd, dirs, nondirs):
+        assert fd is not None
+        assert [entry.name for entry in dirs] == ["inner_dir"]
+        assert [entry.stat(follow_symlinks=False).st_size for entry in nondirs] == [4]
+
+
+def test_walk(fs):
+    fs.create_file("dir/test.txt")
+    fs.create_file("dir/inner_dir/deep_dir/test.txt")
+
+    def visit(top):
+        with scandir(top) as (_, dirs, nondirs):
+            return len(nondirs), [entry.name for entry in dirs]
+
+    content = {path: (depth, count) for path, depth, count, _ in walk("dir", visit, workers=2)}
+
+    assert content == {
+        "dir": (0, 1),
+        os.path.join("dir", "inner_dir"): (1, 0),
+        os.path.join("dir", "inner_dir", "deep_dir"): (2, 1),
+    }
+
+
+def test_walk_with_stop(fs):
+    for index in range(10):
+        fs.create_dir(f"dir/{index}")
+
+    stop = threading.Event()
+    with contextlib.closing(walk("dir", lambda top: (None, os.listdir(top)), 1, stop)) as content:
+        next(content)
+
+    assert stop.is_set()
+
+
+def test_walk_with_error(fs):
+    with pytest.raises(OSError):
+        list(walk("not_exists", lambda top: (None, os.listdir(top))))
+
+
+@pytest.mark.parametrize(
+    "max_depth, expected",
+    [
+        (1, ["dir/test.log"]),
+        (2, ["dir/inner_dir/test.log", "dir/test.log"]),
+        (0, ["dir/inner_dir/deep_dir/test.log", "dir/inner_dir/test.log", "dir/test.log"]),
+    ],
+)
+def test_match(fs, max_depth, expected):
+    for path in ("dir/test.log", "dir/inner_dir/test.log", "dir/inner_dir/deep_dir/test.log"):
+        fs.create_file(path)
+    fs.create_file("dir/test.txt")
+    fs.create_file("outer/test.log")
+    fs.create_symlink("dir/link", "outer")
+
+    assert sorted(match("dir", re.compile(r".*\.log"), max_depth)) == expected
+
+
+def test_match_with_matched_directory(fs):
+    fs.create_file("dir/logs/test.log")
+
+    assert list(match("dir", re.compile("log.*"), max_depth=0)) == ["dir/logs"]
+
+
+def test_match_with_exclude(fs):
+    fs.create_file("dir/trash/test.log")
+    fs.create_file("dir/history.log")
+
+    assert list(match("dir", re.compile(".*"), 0, {"dir/trash", "dir/history.log"})) == []
+
+
+def test_match_with_unreadable_directory(fs, mocker):
+    fs.create_file("dir/inner_dir/test.log")
+    fs.create_file("dir/test.log")
+    original = os.scandir
+
+    def scandir_mock(path):
+        if path == os.path.join("dir", "inner_dir"):
+            raise PermissionError(path)
+        return original(path)
+
+    mocker.patch("myrm.walklib.os.scandir", side_effect=scandir_mock)
+    assert list(match("dir", re.compile(r".*\.log"), max_depth=0)) == ["dir/test.log"]
+
+    with pytest.raises(FileNotFoundError):
+        list(match("not_exists", re.compile(".*")))